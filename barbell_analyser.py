@@ -1,13 +1,43 @@
 """
 This class is responsible for analyzing the position data from the barbell
-tracker using NumPy and SciPy, then plotting it using Matplotlib.
+tracker using NumPy and SciPy.
 """
 
 import numpy as np
-import scipy.signal
-import matplotlib.pyplot as plt
 
 
+ANALYSER_SETTINGS = (
+    "smooth_displacement",
+    "smooth_velocity",
+    "smooth_acceleration",
+    "smooth_window_length",
+    "smooth_polynomial_order",
+    "rep_min_range_m",
+)
+
+PHASE_COLUMNS = (
+    "start_time",
+    "end_time",
+    "concentric",
+    "mean_velocity",
+    "peak_velocity",
+    "time_to_peak",
+    "range_of_motion",
+)
+
+REP_COLUMNS = (
+    "rep",
+    "start_time",
+    "end_time",
+    "mean_velocity",
+    "peak_velocity",
+    "time_to_peak",
+    "range_of_motion",
+    "eccentric_duration",
+    "eccentric_mean_velocity",
+    "eccentric_peak_velocity",
+)
+
 class BarbellAnalyser:
     def __init__(
             self,
@@ -18,80 +48,258 @@ class BarbellAnalyser:
             smooth_velocity=True,
             smooth_acceleration=True,
             smooth_window_length=15,
-            smooth_polynomial_order=3):
+            smooth_polynomial_order=3,
+            rep_min_range_m=0.1,
+            frame_indices=None,
+            scores=None,
+            valid=None,
+            pixels_per_meter=1.0):
         self.smooth_displacement = smooth_displacement
         self.smooth_velocity = smooth_velocity
         self.smooth_acceleration = smooth_acceleration
         self.smooth_window_length = smooth_window_length
         self.smooth_polynomial_order = smooth_polynomial_order
+        self.rep_min_range_m = rep_min_range_m
 
-        self.positions = positions
-        self.timestamps = timestamps
+        # Positions stay in the units they were given and are scaled to
+        # meters with the displacements, so a trajectory's columns are used
+        # without copying
+        self.positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+        self.timestamps = np.asarray(timestamps, dtype=np.float64)
         self.num_frames = num_frames
+        self.pixels_per_meter = pixels_per_meter
+
+        # Source frame and match confidence of each sample, when known
+        if frame_indices is None:
+            frame_indices = np.arange(len(self.timestamps))
+        self.frame_indices = np.asarray(frame_indices, dtype=np.int64)
+        if scores is None:
+            scores = np.full(len(self.timestamps), np.nan)
+        self.scores = np.asarray(scores, dtype=np.float64)
+
+        # Rejected matches are left out of the kinematics but their frames
+        # are kept
+        self.rejected_frames = np.array([], dtype=np.int64)
+        if valid is not None:
+            valid = np.asarray(valid, dtype=bool)
+            if not valid.all():
+                self.rejected_frames = self.frame_indices[~valid]
+                self.positions = self.positions[valid]
+                self.timestamps = self.timestamps[valid]
+                self.frame_indices = self.frame_indices[valid]
+                self.scores = self.scores[valid]
+
+        # Memoized stages, each stored with the settings it was computed from
+        self.stages = {}
+
+    @classmethod
+    def from_trajectory(cls, trajectory, num_frames, pixels_per_meter=1.0, **settings):
+        return cls(
+            trajectory.positions,
+            trajectory.timestamps,
+            num_frames,
+            frame_indices=trajectory.frame_indices,
+            scores=trajectory.scores,
+            valid=trajectory.valid,
+            pixels_per_meter=pixels_per_meter,
+            **settings
+        )
+
+    @property
+    def displacements(self):
+        return self.calculate_displacements()
 
-        self.displacements = []
-        self.velocities = []  # only Y-velocities
-        self.accelerations = []  # only Y-accelerations
+    @property
+    def velocities(self):  # only Y-velocities
+        return self.calculate_velocities()
+
+    @property
+    def accelerations(self):  # only Y-accelerations
+        return self.calculate_accelerations()
+
+    def update_settings(self, **settings):
+        for name, value in settings.items():
+            if name not in ANALYSER_SETTINGS:
+                raise Exception(f"Unknown analyser setting: {name}")
+            setattr(self, name, value)
+
+    def get_smoothing_key(self, enabled):
+        if not enabled:
+            return (False,)
+        return (True, self.smooth_window_length, self.smooth_polynomial_order)
+
+    def get_stage(self, name, key, calculate):
+        cached = self.stages.get(name)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        value = calculate()
+        self.stages[name] = (key, value)
+
+        return value
 
     def smooth_1d(self, data):
+        # SciPy is slow to import, so it is only loaded when first needed
+        import scipy.signal
+
         return scipy.signal.savgol_filter(
             data,
             window_length=self.smooth_window_length,
-            polyorder=self.smooth_polynomial_order
+            polyorder=self.smooth_polynomial_order,
+            axis=0
         )
 
+    def get_displacements_key(self):
+        return self.get_smoothing_key(self.smooth_displacement)
+
+    def get_velocities_key(self):
+        return self.get_displacements_key() + self.get_smoothing_key(self.smooth_velocity)
+
+    def get_accelerations_key(self):
+        return self.get_velocities_key() + self.get_smoothing_key(self.smooth_acceleration)
+
     def calculate_displacements(self):
-        # Normalise starting y position and flip y coordinates
-        start_height = self.positions[0][1]
-        positions_height_normalised = [
-            (position[0], -(position[1] - start_height))
-            for position in self.positions
-        ]
-
-        displacements_x = np.array([p[0] for p in positions_height_normalised])
-        displacements_y = np.array([p[1] for p in positions_height_normalised])
-
-        if self.smooth_displacement:
-            displacements_x_smoothed = self.smooth_1d(displacements_x)
-            displacements_y_smoothed = self.smooth_1d(displacements_y)
-            self.displacements = list(zip(displacements_x_smoothed, displacements_y_smoothed))
-        else:
-            self.displacements = list(zip(displacements_x, displacements_y))
+        def calculate():
+            # Normalise starting y position, flip y coordinates and scale
+            # to meters
+            scale = 1 / self.pixels_per_meter
+            displacements = np.empty_like(self.positions)
+            displacements[:, 0] = self.positions[:, 0] * scale
+            displacements[:, 1] = (self.positions[0, 1] - self.positions[:, 1]) * scale
+
+            if self.smooth_displacement:
+                return self.smooth_1d(displacements)
+            return displacements
+
+        return self.get_stage("displacements", self.get_displacements_key(), calculate)
 
     def calculate_velocities(self):
-        displacements_y = np.array([d[1] for d in self.displacements])
-        velocities_y = list(np.gradient(displacements_y, self.timestamps))
+        def calculate():
+            velocities_y = np.gradient(self.displacements[:, 1], self.timestamps)
+
+            if self.smooth_velocity:
+                return self.smooth_1d(velocities_y)
+            return velocities_y
 
-        if self.smooth_velocity:
-            self.velocities = self.smooth_1d(velocities_y)
-        else:
-            self.velocities = velocities_y
+        return self.get_stage("velocities", self.get_velocities_key(), calculate)
 
     def calculate_accelerations(self):
-        accelerations_y = list(np.gradient(self.velocities, self.timestamps))
+        def calculate():
+            accelerations_y = np.gradient(self.velocities, self.timestamps)
 
-        if self.smooth_acceleration:
-            self.accelerations = self.smooth_1d(accelerations_y)
-        else:
-            self.accelerations = accelerations_y
+            if self.smooth_acceleration:
+                return self.smooth_1d(accelerations_y)
+            return accelerations_y
+
+        return self.get_stage("accelerations", self.get_accelerations_key(), calculate)
 
     def get_results(self):
-        self.calculate_displacements()
-        self.calculate_velocities()
-        self.calculate_accelerations()
+        def calculate():
+            velocities = self.velocities
+            has_velocities = len(velocities) > 0
+
+            results = {}
+            results['peak_velocity'] = np.max(velocities) if has_velocities else 0
+            results['avg_velocity'] = np.mean(velocities) if has_velocities else 0
+            results['min_velocity'] = np.min(velocities) if has_velocities else 0
+            results['std_velocity'] = np.std(velocities) if has_velocities else 0
+            results['total_points'] = len(self.displacements)
+            results['rejected_points'] = len(self.rejected_frames)
+            results['success_rate'] = len(self.displacements) / self.num_frames if self.num_frames > 0 else 0
+            results['rep_count'] = len(self.get_reps()["rep"])
+
+            return results
+
+        return dict(self.get_stage("results", self.get_velocities_key() + (self.rep_min_range_m,), calculate))
+
+    def get_phases(self):
+        def calculate():
+            import scipy.signal
+
+            displacements_y = self.displacements[:, 1]
+            velocities = self.velocities
+            timestamps = self.timestamps
+            num_samples = len(displacements_y)
+
+            if num_samples < 2:
+                return {name: np.array([]) for name in PHASE_COLUMNS}
 
-        results = {}
-        results['peak_velocity'] = max(self.velocities) if self.velocities.any() else 0
-        results['avg_velocity'] = np.mean(self.velocities) if self.velocities.any() else 0
-        results['min_velocity'] = min(self.velocities) if self.velocities.any() else 0
-        results['std_velocity'] = np.std(self.velocities) if self.velocities.any() else 0
-        results['total_points'] = len(self.displacements)
-        results['success_rate'] = len(self.displacements) / self.num_frames if self.num_frames > 0 else 0
+            # Turning points are the tops and bottoms of the vertical
+            # displacement, ignoring wobbles smaller than a rep
+            tops, _ = scipy.signal.find_peaks(displacements_y, prominence=self.rep_min_range_m)
+            bottoms, _ = scipy.signal.find_peaks(-displacements_y, prominence=self.rep_min_range_m)
+            turning_points = np.unique(np.concatenate(([0], tops, bottoms, [num_samples - 1])))
 
-        return results
+            starts = turning_points[:-1]
+            ends = turning_points[1:]
+            lengths = np.diff(np.append(starts, num_samples))
+
+            concentric = displacements_y[ends] > displacements_y[starts]
+            sums = np.add.reduceat(velocities, starts)
+            peaks = np.where(
+                concentric,
+                np.maximum.reduceat(velocities, starts),
+                np.minimum.reduceat(velocities, starts)
+            )
+
+            # First sample in each phase that reaches the phase's peak
+            phase_ids = np.repeat(np.arange(len(starts)), lengths)
+            sample_ids = np.arange(num_samples)
+            is_peak = velocities == peaks[phase_ids]
+            peak_ids = np.minimum.reduceat(np.where(is_peak, sample_ids, num_samples), starts)
+
+            return {
+                "start_time": timestamps[starts],
+                "end_time": timestamps[ends],
+                "concentric": concentric,
+                "mean_velocity": sums / lengths,
+                "peak_velocity": peaks,
+                "time_to_peak": timestamps[peak_ids] - timestamps[starts],
+                "range_of_motion": np.abs(displacements_y[ends] - displacements_y[starts]),
+            }
+
+        return self.get_stage("phases", self.get_velocities_key() + (self.rep_min_range_m,), calculate)
+
+    def get_reps(self):
+        def calculate():
+            phases = self.get_phases()
+
+            # Each concentric phase is a rep, paired with the eccentric
+            # phase leading into it when there is one
+            valid = phases["range_of_motion"] >= self.rep_min_range_m
+            concentric_ids = np.flatnonzero(phases["concentric"] & valid)
+            eccentric_ids = concentric_ids - 1
+            has_eccentric = eccentric_ids >= 0
+            has_eccentric[has_eccentric] = (
+                ~phases["concentric"][eccentric_ids[has_eccentric]]
+                & valid[eccentric_ids[has_eccentric]]
+            )
+            eccentric_ids = np.where(has_eccentric, eccentric_ids, concentric_ids)
+
+            return {
+                "rep": np.arange(1, len(concentric_ids) + 1),
+                "start_time": phases["start_time"][concentric_ids],
+                "end_time": phases["end_time"][concentric_ids],
+                "mean_velocity": phases["mean_velocity"][concentric_ids],
+                "peak_velocity": phases["peak_velocity"][concentric_ids],
+                "time_to_peak": phases["time_to_peak"][concentric_ids],
+                "range_of_motion": phases["range_of_motion"][concentric_ids],
+                "eccentric_duration": np.where(
+                    has_eccentric,
+                    phases["end_time"][eccentric_ids] - phases["start_time"][eccentric_ids],
+                    np.nan
+                ),
+                "eccentric_mean_velocity": np.where(
+                    has_eccentric, phases["mean_velocity"][eccentric_ids], np.nan),
+                "eccentric_peak_velocity": np.where(
+                    has_eccentric, phases["peak_velocity"][eccentric_ids], np.nan),
+            }
+
+        return self.get_stage("reps", self.get_velocities_key() + (self.rep_min_range_m,), calculate)
 
     def get_results_string(self):
         results = self.get_results()
+        reps = self.get_reps()
 
         results_string = f"Barbell Lift Velocity Analysis Results\n"
         results_string += f"{'='*50}\n"
@@ -100,61 +308,19 @@ class BarbellAnalyser:
         results_string += f"Minimum Velocity: {results['min_velocity']:.3f} m/s\n"
         results_string += f"Standard Deviation: {results['std_velocity']:.3f} m/s\n"
         results_string += f"Total Points: {results['total_points']}\n"
+        results_string += f"Rejected Points: {results['rejected_points']}\n"
         results_string += f"Success Rate: {results['success_rate']:.1f}%\n"
         results_string += f"{'='*50}\n"
 
-        return results_string
+        results_string += f"Reps: {len(reps['rep'])}\n"
+        for rep, mean_velocity, peak_velocity, time_to_peak, range_of_motion in zip(
+                reps["rep"], reps["mean_velocity"], reps["peak_velocity"],
+                reps["time_to_peak"], reps["range_of_motion"]):
+            results_string += (
+                f"Rep {rep}: mean {mean_velocity:.3f} m/s, peak {peak_velocity:.3f} m/s, "
+                f"time to peak {time_to_peak:.2f} s, ROM {range_of_motion:.3f} m\n"
+            )
+        if len(reps["rep"]):
+            results_string += f"{'='*50}\n"
 
-    def plot_data(self):
-        plt.figure(figsize=(9, 6))
-
-        # Plot displacement-time
-        displacements_y = np.array([d[1] for d in self.displacements])
-
-        plt.subplot(2, 2, 1)
-        plt.plot(self.timestamps, displacements_y)
-        plt.xlabel("Time (s)")
-        plt.ylabel("Barbell Vertical Displacement (m)")
-        plt.title("Barbell Vertical Displacement Over Time")
-        plt.grid()
-
-        # Plot velocity-time
-        plt.subplot(2, 2, 2)
-        plt.plot(self.timestamps, self.velocities)
-        plt.xlabel("Time (s)")
-        plt.ylabel("Barbell Vertical Velocity (m/s)")
-        plt.title("Barbell Vertical Velocity Over Time")
-        plt.grid()
-
-        # Plot acceleration-time
-        plt.subplot(2, 2, 3)
-        plt.plot(self.timestamps, self.accelerations)
-        plt.xlabel("Time (s)")
-        plt.ylabel("Barbell Vertical Acceleration (m/s²)")
-        plt.title("Barbell Vertical Acceleration Over Time")
-        plt.grid()
-
-        # Plot bar path
-        xs = [pos[0] for pos in self.displacements]
-        ys = [pos[1] for pos in self.displacements]
-        start_pos = self.displacements[0]
-        end_pos = self.displacements[-1]
-
-        plt.subplot(2, 2, 4)
-        plt.plot(xs, ys)
-        plt.xlabel("Barbell Horizontal Displacement (m)")
-        plt.ylabel("Barbell Vertical Displacement (m)")
-        plt.title("Barbell Path")
-        plt.text(start_pos[0], start_pos[1], "Start", fontsize=10, verticalalignment='center')
-        plt.text(end_pos[0], end_pos[1], "End", fontsize=10, verticalalignment='center')
-        plt.grid()
-
-        plt.tight_layout()
-        plt.show()
-    
-    def export_to_tuple(self):
-        data = [("frame_number", "timestamp", "x_pos", "y_pos")]
-        for i, (t, (x, y)) in enumerate(zip(self.timestamps, self.displacements)):
-            data.append((i, t, x, y))
-
-        return tuple(data)
+        return results_string
@@ -0,0 +1,284 @@
+"""
+This module is responsible for running the barbell tracker and analyser
+headlessly over many videos using a process pool, writing one results file
+per clip plus a summary.
+"""
+
+import collections
+import concurrent.futures
+import csv
+import json
+import os
+import time
+
+import cv2
+
+import barbell_exporter
+from barbell_tracker import BarbellTracker, find_active_range
+from barbell_analyser import BarbellAnalyser
+from barbell_cache import TrackingCache
+
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv", ".wmv")
+TEMPLATE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+
+
+def load_jobs(source):
+    if os.path.isdir(source):
+        return load_jobs_from_directory(source)
+
+    if source.lower().endswith(".json"):
+        return load_jobs_from_json(source)
+
+    if source.lower().endswith(".csv"):
+        return load_jobs_from_csv(source)
+
+    raise Exception(f"Unsupported clip source: {source}")
+
+
+def load_jobs_from_directory(directory):
+    # Each video needs a sidecar file with the same name, either a JSON file
+    # holding its template region or an image of the template itself
+    jobs = []
+    for filename in sorted(os.listdir(directory)):
+        stem, extension = os.path.splitext(filename)
+        if extension.lower() not in VIDEO_EXTENSIONS:
+            continue
+
+        job = {"video": os.path.join(directory, filename)}
+
+        sidecar_path = os.path.join(directory, stem + ".json")
+        if os.path.exists(sidecar_path):
+            with open(sidecar_path) as f:
+                job["template_region"] = json.load(f)["template_region"]
+
+        for template_extension in TEMPLATE_EXTENSIONS:
+            template_path = os.path.join(directory, stem + template_extension)
+            if os.path.exists(template_path):
+                job["template_image"] = template_path
+                break
+
+        jobs.append(job)
+
+    return jobs
+
+
+def load_jobs_from_json(manifest_path):
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    with open(manifest_path) as f:
+        entries = json.load(f)
+
+    jobs = []
+    for entry in entries:
+        job = {"video": os.path.join(base_dir, entry["video"])}
+        if entry.get("template_region"):
+            job["template_region"] = entry["template_region"]
+        if entry.get("template_image"):
+            job["template_image"] = os.path.join(base_dir, entry["template_image"])
+        for key in ("start_time", "end_time"):
+            if entry.get(key) is not None:
+                job[key] = float(entry[key])
+        jobs.append(job)
+
+    return jobs
+
+
+def load_jobs_from_csv(manifest_path):
+    # Columns: video, x, y, w, h, template_image, start_time, end_time (region
+    # or image and the times may be blank)
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    jobs = []
+    with open(manifest_path, newline="") as f:
+        for row in csv.DictReader(f):
+            job = {"video": os.path.join(base_dir, row["video"])}
+            if row.get("x"):
+                job["template_region"] = [int(row[key]) for key in ("x", "y", "w", "h")]
+            if row.get("template_image"):
+                job["template_image"] = os.path.join(base_dir, row["template_image"])
+            for key in ("start_time", "end_time"):
+                if row.get(key):
+                    job[key] = float(row[key])
+            jobs.append(job)
+
+    return jobs
+
+
+def get_clip_names(jobs):
+    # Output files are named after each video. Videos that share a filename
+    # are told apart by the folders they sit in, and a video listed twice
+    # gets a counter.
+    videos = [os.path.splitext(os.path.abspath(job["video"]))[0] for job in jobs]
+    stems = [os.path.basename(video) for video in videos]
+    stem_counts = collections.Counter(stems)
+    shared = [os.path.dirname(video) for video, stem in zip(videos, stems) if stem_counts[stem] > 1]
+    root = os.path.commonpath(shared) if shared else None
+
+    names = []
+    used = set()
+    for video, stem in zip(videos, stems):
+        name = stem
+        if stem_counts[stem] > 1:
+            name = os.path.relpath(video, root).replace(os.sep, "_")
+
+        unique_name = name
+        count = 1
+        while unique_name in used:
+            count += 1
+            unique_name = f"{name}_{count}"
+        used.add(unique_name)
+        names.append(unique_name)
+
+    return names
+
+
+def get_json_results(analyser):
+    results = {
+        key: value.item() if hasattr(value, "item") else value
+        for key, value in analyser.get_results().items()
+    }
+
+    # Reps without a leading eccentric phase have NaN eccentric metrics,
+    # which JSON cannot represent
+    reps = {
+        name: [None if value != value else value for value in values.tolist()]
+        for name, values in analyser.get_reps().items()
+    }
+
+    return results, reps
+
+
+def process_clip(job, tracker_settings, analyser_settings, output_dir, cache_dir=None, export_format=None, auto_range=False):
+    start_time = time.perf_counter()
+
+    clip_name = job.get("name") or os.path.splitext(os.path.basename(job["video"]))[0]
+    if "template_region" not in job and "template_image" not in job and not tracker_settings.get("auto_detect", True):
+        raise Exception(f"No template region or template image for {clip_name}.")
+
+    template_image = None
+    if "template_image" in job:
+        template_image = cv2.imread(job["template_image"])
+        if template_image is None:
+            raise Exception(f"Could not read template image {job['template_image']}.")
+
+    cache = TrackingCache(cache_dir) if cache_dir else None
+    tracker = BarbellTracker(cache=cache, **tracker_settings)
+    template_region = job.get("template_region")
+    range_start = job.get("start_time")
+    range_end = job.get("end_time")
+
+    # Clips without explicit times are trimmed to where the bar moves
+    if auto_range and range_start is None and range_end is None:
+        active_range = find_active_range(job["video"], region=template_region)
+        if active_range is not None:
+            range_start, range_end = active_range
+
+    trajectory = tracker.track(
+        job["video"],
+        template_region=tuple(template_region) if template_region else None,
+        template_image=template_image,
+        start_time=range_start,
+        end_time=range_end
+    )
+
+    analyser = BarbellAnalyser.from_trajectory(
+        trajectory,
+        tracker.get_tracked_frame_count(),
+        tracker.pixels_per_meter,
+        **analyser_settings
+    )
+    results, reps = get_json_results(analyser)
+
+    elapsed = time.perf_counter() - start_time
+    clip = {
+        "name": clip_name,
+        "video": job["video"],
+        "template_region": list(tracker.template_region),
+        "template_frame": tracker.template_frame,
+        "plate_detection": tracker.detection,
+        "fps": tracker.fps,
+        "num_frames": tracker.num_frames,
+        "start_frame": tracker.start_frame,
+        "end_frame": tracker.end_frame if tracker.end_frame is not None else tracker.num_frames,
+        "frames_processed": tracker.current_frame - tracker.start_frame,
+        "pixels_per_meter": tracker.pixels_per_meter,
+        "elapsed_s": elapsed,
+        "results": results,
+        "reps": reps,
+        "tracker_stats": tracker.stats.get_snapshot(),
+        "timestamps": analyser.timestamps.tolist(),
+        "positions": analyser.positions.tolist(),
+        "rejected_frames": analyser.rejected_frames.tolist(),
+    }
+
+    with open(os.path.join(output_dir, clip_name + "_results.json"), "w") as f:
+        json.dump(clip, f)
+
+    if export_format is not None:
+        extension = "." + export_format
+        barbell_exporter.export_samples(analyser, os.path.join(output_dir, clip_name + "_data" + extension), export_format)
+        barbell_exporter.export_reps(analyser, os.path.join(output_dir, clip_name + "_reps" + extension), export_format)
+
+    return clip
+
+
+def run_batch(jobs, output_dir, workers=None, tracker_settings=None, analyser_settings=None, cache_dir=None, export_format=None, auto_range=False, log=print):
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Clips run one per process, so each tracker stays single-process and
+    # never opens a preview or selection window
+    tracker_settings = dict(tracker_settings or {})
+    tracker_settings["show_preview"] = False
+    tracker_settings["workers"] = 1
+    tracker_settings["manual_fallback"] = False
+    analyser_settings = analyser_settings or {}
+
+    # Each clip gets its own output name so clips with the same filename in
+    # different folders don't overwrite each other's results
+    jobs = [dict(job, name=name) for job, name in zip(jobs, get_clip_names(jobs))]
+
+    start_time = time.perf_counter()
+    total_frames = 0
+    summary = []
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(
+                process_clip, job, tracker_settings, analyser_settings, output_dir, cache_dir, export_format, auto_range): job
+            for job in jobs
+        }
+
+        for completed, future in enumerate(concurrent.futures.as_completed(futures), start=1):
+            job = futures[future]
+            try:
+                clip = future.result()
+                total_frames += clip["frames_processed"]
+                summary.append({
+                    "name": clip["name"],
+                    "video": clip["video"],
+                    "status": "ok",
+                    "elapsed_s": clip["elapsed_s"],
+                    "results": clip["results"],
+                })
+                status = "done"
+            except Exception as e:
+                summary.append({"name": job["name"], "video": job["video"], "status": "error", "error": str(e)})
+                status = f"failed ({e})"
+
+            elapsed = time.perf_counter() - start_time
+            clips_per_minute = completed / elapsed * 60 if elapsed > 0 else 0
+            frames_per_second = total_frames / elapsed if elapsed > 0 else 0
+            log(f"[{completed}/{len(jobs)}] {job['name']} {status} - "
+                f"{clips_per_minute:.1f} clips/min, {frames_per_second:.0f} fps")
+
+    summary.sort(key=lambda clip: clip["video"])
+    elapsed = time.perf_counter() - start_time
+    with open(os.path.join(output_dir, "summary.json"), "w") as f:
+        json.dump({
+            "clips": summary,
+            "elapsed_s": elapsed,
+            "total_frames": total_frames,
+            "clips_per_minute": len(jobs) / elapsed * 60 if elapsed > 0 else 0,
+            "frames_per_second": total_frames / elapsed if elapsed > 0 else 0,
+        }, f, indent=2)
+
+    return summary
@@ -0,0 +1,240 @@
+"""
+This class is responsible for caching barbell tracker output on disk, keyed by
+the video content and the tracker settings, so a repeat analysis of a known
+clip does not need to decode and track the video again.
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+
+from barbell_trajectory import Trajectory
+
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".barbell_tracker", "cache")
+
+# Tracker settings that only change how tracking is displayed or scheduled,
+# not the positions it produces
+IGNORED_SETTINGS = (
+    "show_preview",
+    "show_bar_path",
+    "queue_size",
+    "workers",
+    "preview_fps",
+    "auto_detect",
+    "detection_threshold",
+    "manual_fallback",
+)
+
+# Videos whose hashes are remembered before the least recently used are
+# forgotten
+MAX_HASH_ENTRIES = 1000
+
+
+class TrackingCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_size_bytes=256 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_size_bytes = max_size_bytes
+        self.hash_dir = os.path.join(cache_dir, "video_hashes")
+        os.makedirs(self.hash_dir, exist_ok=True)
+
+    def get_video_hash(self, video_path):
+        # Hashing a long video takes a while, so remember the hash for as long
+        # as the file keeps the same size and modification time
+        stat = os.stat(video_path)
+        entry_path = self.get_hash_entry_path(video_path)
+        entry = self.load_hash_entry(entry_path)
+        if entry is not None and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            # Touch the entry so eviction treats it as recently used. The hash
+            # still holds if another process evicted the entry meanwhile, so
+            # the entry is written again.
+            if not self.touch_file(entry_path):
+                self.set_video_hash(video_path, entry["hash"])
+            return entry["hash"]
+
+        digest = hashlib.sha256()
+        with open(video_path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        video_hash = digest.hexdigest()
+
+        self.set_video_hash(video_path, video_hash)
+
+        return video_hash
+
+    def set_video_hash(self, video_path, video_hash):
+        # Callers that hashed the video while writing it can record the hash
+        # here so it is never read back just to be hashed
+        stat = os.stat(video_path)
+        self.write_atomic(self.get_hash_entry_path(video_path), json.dumps({
+            "path": os.path.abspath(video_path),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "hash": video_hash,
+        }).encode())
+
+    def forget_video_hash(self, video_path):
+        self.remove_file(self.get_hash_entry_path(video_path))
+
+    def get_hash_entry_path(self, video_path):
+        # One small file per video, so concurrent workers never overwrite
+        # each other's entries
+        name = hashlib.sha256(os.path.abspath(video_path).encode()).hexdigest()
+        return os.path.join(self.hash_dir, name + ".json")
+
+    def load_hash_entry(self, entry_path):
+        try:
+            with open(entry_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def make_key(self, video_path, template_region, settings):
+        settings = {
+            name: value for name, value in settings.items()
+            if name not in IGNORED_SETTINGS
+        }
+        key_data = json.dumps({
+            "video": self.get_video_hash(video_path),
+            "template_region": [int(value) for value in template_region],
+            "settings": settings,
+        }, sort_keys=True)
+
+        return hashlib.sha256(key_data.encode()).hexdigest()
+
+    def get_entry_path(self, key):
+        return os.path.join(self.cache_dir, key + ".npz")
+
+    def load(self, key):
+        entry_path = self.get_entry_path(key)
+        try:
+            with np.load(entry_path) as entry:
+                data = {name: entry[name] for name in entry.files}
+        except (OSError, ValueError):
+            return None
+
+        # Entries from before rejected matches were kept have no mask and
+        # are tracked again
+        if "valid" not in data:
+            return None
+
+        # Touch the entry so eviction treats it as recently used. An entry
+        # another process evicted since it was read counts as a miss.
+        if not self.touch_file(entry_path):
+            return None
+
+        return {
+            "trajectory": Trajectory.from_columns(
+                data["frame_indices"],
+                data["timestamps"],
+                data["positions"],
+                data["scores"],
+                data["valid"]
+            ),
+            "fps": int(data["fps"]),
+            "num_frames": int(data["num_frames"]),
+            "pixels_per_meter": float(data["pixels_per_meter"]),
+        }
+
+    def store(self, key, trajectory, fps, num_frames, pixels_per_meter):
+        entry_path = self.get_entry_path(key)
+        temp_path = f"{entry_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+        with open(temp_path, "wb") as f:
+            np.savez_compressed(
+                f,
+                positions=trajectory.positions.astype(np.float32),
+                timestamps=trajectory.timestamps,
+                scores=trajectory.scores.astype(np.float32),
+                frame_indices=trajectory.frame_indices.astype(np.int32),
+                valid=trajectory.valid,
+                fps=np.int32(fps),
+                num_frames=np.int32(num_frames),
+                pixels_per_meter=np.float64(pixels_per_meter)
+            )
+        os.replace(temp_path, entry_path)
+
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for filename in os.listdir(self.cache_dir):
+            if not filename.endswith(".npz"):
+                continue
+            path = os.path.join(self.cache_dir, filename)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        # Remove least recently used entries until the cache fits its budget
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total_size -= size
+
+        self.evict_hashes()
+
+    def evict_hashes(self):
+        # Entries for videos that were deleted or changed are dropped, then
+        # the least recently used beyond MAX_HASH_ENTRIES
+        entries = []
+        for filename in os.listdir(self.hash_dir):
+            if not filename.endswith(".json"):
+                continue
+            entry_path = os.path.join(self.hash_dir, filename)
+            entry = self.load_hash_entry(entry_path)
+            if entry is None or not self.is_hash_entry_current(entry):
+                self.remove_file(entry_path)
+                continue
+            try:
+                entries.append((os.stat(entry_path).st_mtime, entry_path))
+            except OSError:
+                continue
+
+        for _, entry_path in sorted(entries)[:max(len(entries) - MAX_HASH_ENTRIES, 0)]:
+            self.remove_file(entry_path)
+
+        # Older versions kept every hash in one ever-growing file
+        self.remove_file(os.path.join(self.cache_dir, "video_hashes.json"))
+
+    def is_hash_entry_current(self, entry):
+        try:
+            stat = os.stat(entry["path"])
+        except OSError:
+            return False
+        return stat.st_size == entry["size"] and stat.st_mtime_ns == entry["mtime_ns"]
+
+    def touch_file(self, path):
+        # Returns False when the file no longer exists
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def remove_file(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def clear(self):
+        for filename in os.listdir(self.cache_dir):
+            if filename.endswith(".npz"):
+                os.remove(os.path.join(self.cache_dir, filename))
+
+    def write_atomic(self, path, data):
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
@@ -0,0 +1,136 @@
+"""
+This module is responsible for exporting barbell analysis data column by
+column, in chunks, to CSV, NumPy .npz and, when pyarrow is installed, Parquet
+or Arrow files.
+"""
+
+import os
+
+import numpy as np
+
+
+EXPORT_FORMATS = {
+    ".csv": "csv",
+    ".npz": "npz",
+    ".parquet": "parquet",
+    ".arrow": "arrow",
+    ".feather": "arrow",
+}
+
+DEFAULT_CHUNK_SIZE = 65536
+
+
+def get_sample_columns(analyser):
+    displacements = analyser.displacements
+    return {
+        "frame_number": analyser.frame_indices,
+        "timestamp": analyser.timestamps,
+        "x_pos": displacements[:, 0],
+        "y_pos": displacements[:, 1],
+        "velocity": analyser.velocities,
+        "acceleration": analyser.accelerations,
+        "match_score": analyser.scores,
+    }
+
+
+def get_rep_columns(analyser):
+    return dict(analyser.get_reps())
+
+
+def get_export_format(path, export_format=None):
+    if export_format is not None:
+        return export_format
+
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in EXPORT_FORMATS:
+        raise Exception(f"Unknown export format for {path}.")
+
+    return EXPORT_FORMATS[extension]
+
+
+def get_available_formats():
+    formats = ["csv", "npz"]
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return formats
+    return formats + ["parquet", "arrow"]
+
+
+def export_samples(analyser, path, export_format=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    write_columns(get_sample_columns(analyser), path, get_export_format(path, export_format), chunk_size)
+
+
+def export_reps(analyser, path, export_format=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    write_columns(get_rep_columns(analyser), path, get_export_format(path, export_format), chunk_size)
+
+
+def write_columns(columns, path, export_format, chunk_size=DEFAULT_CHUNK_SIZE):
+    if export_format == "csv":
+        write_csv(columns, path, chunk_size)
+    elif export_format == "npz":
+        write_npz(columns, path)
+    elif export_format == "parquet":
+        write_parquet(columns, path, chunk_size)
+    elif export_format == "arrow":
+        write_arrow(columns, path, chunk_size)
+    else:
+        raise Exception(f"Unknown export format: {export_format}")
+
+
+def write_csv(columns, path, chunk_size):
+    names = list(columns)
+    arrays = [np.asarray(columns[name]) for name in names]
+    formats = ["%d" if np.issubdtype(array.dtype, np.integer) else "%.10g" for array in arrays]
+    num_rows = len(arrays[0]) if arrays else 0
+
+    # Each chunk is formatted by NumPy in one call rather than row by row
+    with open(path, "w", newline="") as f:
+        f.write(",".join(names) + "\n")
+        for start in range(0, num_rows, chunk_size):
+            chunk = np.column_stack([array[start:start + chunk_size].astype(np.float64) for array in arrays])
+            np.savetxt(f, chunk, fmt=formats, delimiter=",")
+
+
+def write_npz(columns, path):
+    np.savez_compressed(path, **{name: np.asarray(values) for name, values in columns.items()})
+
+
+def get_arrow_batches(columns, chunk_size):
+    import pyarrow as pa
+
+    names = list(columns)
+    arrays = [np.asarray(columns[name]) for name in names]
+    num_rows = len(arrays[0]) if arrays else 0
+    schema = pa.schema([(name, pa.from_numpy_dtype(array.dtype)) for name, array in zip(names, arrays)])
+
+    def batches():
+        for start in range(0, num_rows, chunk_size):
+            yield pa.record_batch([array[start:start + chunk_size] for array in arrays], schema=schema)
+
+    return schema, batches()
+
+
+def write_parquet(columns, path, chunk_size):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise Exception("Parquet export requires pyarrow to be installed.")
+
+    schema, batches = get_arrow_batches(columns, chunk_size)
+    with pq.ParquetWriter(path, schema) as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+
+
+def write_arrow(columns, path, chunk_size):
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise Exception("Arrow export requires pyarrow to be installed.")
+
+    schema, batches = get_arrow_batches(columns, chunk_size)
+    with pa.OSFile(path, "wb") as sink:
+        with pa.ipc.new_file(sink, schema) as writer:
+            for batch in batches:
+                writer.write_batch(batch)
@@ -9,8 +9,27 @@ import os
 import tkinter as tk
 
 from tkinter import ttk, filedialog, messagebox
-from barbell_tracker import BarbellTracker
-from barbell_analyser import BarbellAnalyser
+
+from barbell_job import TrackingJob
+
+
+# OpenCV, SciPy and Matplotlib take seconds to import, so the window is shown
+# first and these modules are loaded in the background
+WARM_UP_MODULES = (
+    "barbell_tracker",
+    "barbell_analyser",
+    "barbell_streaming",
+    "barbell_cache",
+    "barbell_exporter",
+    "scipy.signal",
+    "barbell_plots",
+)
+
+# Milliseconds between checks for messages from the tracking process
+JOB_POLL_INTERVAL_MS = 50
+
+# Suggested lifts for saved sessions; any other name can be typed in
+COMMON_LIFTS = ("squat", "bench", "deadlift", "press", "clean", "snatch")
 
 
 class BarbellGUI:
@@ -18,9 +37,15 @@ class BarbellGUI:
         self.root = root
         self.root.title("Barbell Velocity Analyzer")
         self.root.geometry("800x600")
-        self.tracker = None
+        self.job = None
+        self.pixels_per_meter = None
         self.analyser = None
+        self.stream_analyser = None
+        self.plot_panel = None
+        self.preview_image = None
         self.setup_ui()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.root.after(0, self.start_warm_up)
 
     def setup_ui(self):
         # Main frame
@@ -50,6 +75,33 @@ class BarbellGUI:
         browse_btn = ttk.Button(file_frame, text="Browse", command=self.btn_browse_click)
         browse_btn.grid(row=0, column=2)
 
+        self.athlete_var = tk.StringVar()
+        ttk.Label(file_frame, text="Athlete:").grid(row=1, column=0, sticky=tk.W, pady=(5, 0))
+        athlete_entry = ttk.Entry(file_frame, textvariable=self.athlete_var, width=30)
+        athlete_entry.grid(row=1, column=1, padx=(10, 10), pady=(5, 0), sticky=tk.W)
+
+        self.lift_var = tk.StringVar(value=COMMON_LIFTS[0])
+        ttk.Label(file_frame, text="Lift:").grid(row=2, column=0, sticky=tk.W, pady=(5, 0))
+        lift_combo = ttk.Combobox(file_frame, textvariable=self.lift_var, values=COMMON_LIFTS, width=28)
+        lift_combo.grid(row=2, column=1, padx=(10, 10), pady=(5, 0), sticky=tk.W)
+
+        # Blank bounds track from the start or to the end of the video
+        range_frame = ttk.Frame(file_frame)
+        range_frame.grid(row=3, column=1, padx=(10, 10), pady=(5, 0), sticky=tk.W)
+        ttk.Label(file_frame, text="Range (seconds):").grid(row=3, column=0, sticky=tk.W, pady=(5, 0))
+
+        self.start_time_var = tk.StringVar()
+        start_time_entry = ttk.Entry(range_frame, textvariable=self.start_time_var, width=8)
+        start_time_entry.grid(row=0, column=0)
+        ttk.Label(range_frame, text="to").grid(row=0, column=1, padx=5)
+
+        self.end_time_var = tk.StringVar()
+        end_time_entry = ttk.Entry(range_frame, textvariable=self.end_time_var, width=8)
+        end_time_entry.grid(row=0, column=2)
+
+        self.auto_range_btn = ttk.Button(range_frame, text="Auto", command=self.btn_auto_range_click)
+        self.auto_range_btn.grid(row=0, column=3, padx=(10, 0))
+
         # Tracker settings
         tracker_settings_frame = ttk.LabelFrame(main_frame, text="Tracker Settings", padding="10")
         tracker_settings_frame.grid(row=2, column=0, sticky="NSEW", padx=(0, 5), pady=(0, 10))
@@ -77,6 +129,34 @@ class BarbellGUI:
         preview_check = ttk.Checkbutton(tracker_settings_frame, text="Trace Bar Path", variable=self.show_bar_path_var)
         preview_check.grid(row=4, column=0, sticky="NSEW")
 
+        self.predict_motion_var = tk.BooleanVar(value=True)
+        predict_motion_check = ttk.Checkbutton(tracker_settings_frame, text="Motion Prediction", variable=self.predict_motion_var)
+        predict_motion_check.grid(row=5, column=0, sticky="NSEW")
+
+        self.grayscale_matching_var = tk.BooleanVar(value=False)
+        grayscale_matching_check = ttk.Checkbutton(tracker_settings_frame, text="Grayscale Matching", variable=self.grayscale_matching_var)
+        grayscale_matching_check.grid(row=6, column=0, sticky="NSEW")
+
+        self.pyramid_levels_var = tk.IntVar(value=0)
+        ttk.Label(tracker_settings_frame, text="Pyramid Levels:").grid(row=7, column=0, sticky="NSEW")
+        pyramid_levels_entry = ttk.Entry(tracker_settings_frame, textvariable=self.pyramid_levels_var, width=10)
+        pyramid_levels_entry.grid(row=7, column=1, padx=(10, 0))
+
+        self.workers_var = tk.IntVar(value=1)
+        ttk.Label(tracker_settings_frame, text="Worker Processes:").grid(row=8, column=0, sticky="NSEW")
+        workers_entry = ttk.Entry(tracker_settings_frame, textvariable=self.workers_var, width=10)
+        workers_entry.grid(row=8, column=1, padx=(10, 0))
+
+        self.backend_var = tk.StringVar(value="template")
+        ttk.Label(tracker_settings_frame, text="Tracking Backend:").grid(row=9, column=0, sticky="NSEW")
+        backend_combo = ttk.Combobox(tracker_settings_frame, textvariable=self.backend_var, values=["template"], state="readonly", width=18)
+        backend_combo.grid(row=9, column=1, padx=(10, 0))
+        self.backend_combo = backend_combo
+
+        self.auto_detect_var = tk.BooleanVar(value=True)
+        auto_detect_check = ttk.Checkbutton(tracker_settings_frame, text="Auto-detect Plate", variable=self.auto_detect_var)
+        auto_detect_check.grid(row=10, column=0, sticky="NSEW")
+
         # Analyser settings
         analyser_settings_frame = ttk.LabelFrame(main_frame, text="Analyser Settings", padding="10")
         analyser_settings_frame.grid(row=2, column=1, sticky=(tk.W, tk.E, tk.N, tk.S), padx=(5, 0), pady=(0, 10))
@@ -103,6 +183,11 @@ class BarbellGUI:
         smooth_polynomial_order_entry = ttk.Entry(analyser_settings_frame, textvariable=self.smooth_polynomial_order_var, width=10)
         smooth_polynomial_order_entry.grid(row=4, column=1, padx=(10, 0))
 
+        self.rep_min_range_var = tk.DoubleVar(value=0.1)
+        ttk.Label(analyser_settings_frame, text="Minimum Rep Range (meters):").grid(row=5, column=0, sticky="NSEW")
+        rep_min_range_entry = ttk.Entry(analyser_settings_frame, textvariable=self.rep_min_range_var, width=10)
+        rep_min_range_entry.grid(row=5, column=1, padx=(10, 0))
+
         # Control buttons
         control_frame = ttk.Frame(main_frame)
         control_frame.grid(row=3, column=0, columnspan=2, pady=(10, 0))
@@ -110,19 +195,36 @@ class BarbellGUI:
         self.analyze_btn = ttk.Button(control_frame, text="Track Video", command=self.btn_analyse_click, padding=8)
         self.analyze_btn.grid(row=0, column=0)
 
+        self.reanalyse_btn = ttk.Button(control_frame, text="Re-analyse", command=self.btn_reanalyse_click, padding=8)
+        self.reanalyse_btn.grid(row=0, column=1)
+
         self.plot_btn = ttk.Button(control_frame, text="Plot Analysis", command=self.btn_plot_click, padding=8)
-        self.plot_btn.grid(row=0, column=1)
+        self.plot_btn.grid(row=0, column=2)
 
         self.export_btn = ttk.Button(control_frame, text="Export data", command=self.btn_export_click, padding=8)
-        self.export_btn.grid(row=0, column=2)
+        self.export_btn.grid(row=0, column=3)
+
+        self.save_btn = ttk.Button(control_frame, text="Save Session", command=self.btn_save_click, padding=8)
+        self.save_btn.grid(row=0, column=4)
+
+        self.cancel_btn = ttk.Button(control_frame, text="Cancel", command=self.btn_cancel_click, padding=8, state="disabled")
+        self.cancel_btn.grid(row=0, column=5)
 
         # Progress bar
         self.progress_var = tk.StringVar(value="Ready")
         progress_label = ttk.Label(main_frame, textvariable=self.progress_var)
         progress_label.grid(row=4, column=0, columnspan=2, pady=(10, 0))
 
-        self.progress_bar = ttk.Progressbar(main_frame, mode='determinate')
-        self.progress_bar.grid(row=5, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(5, 0))
+        progress_frame = ttk.Frame(main_frame)
+        progress_frame.grid(row=5, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(5, 0))
+        progress_frame.columnconfigure(0, weight=1)
+
+        self.progress_bar = ttk.Progressbar(progress_frame, mode='determinate')
+        self.progress_bar.grid(row=0, column=0, sticky=(tk.W, tk.E))
+
+        self.stats_var = tk.StringVar(value="")
+        stats_label = ttk.Label(progress_frame, textvariable=self.stats_var)
+        stats_label.grid(row=0, column=1, padx=(10, 0))
 
         # Results
         results_frame = ttk.LabelFrame(main_frame, text="Analysis Results", padding="10")
@@ -130,13 +232,54 @@ class BarbellGUI:
         results_frame.columnconfigure(0, weight=1)
         results_frame.rowconfigure(0, weight=1)
 
-        self.results_text = tk.Text(results_frame, height=10, wrap=tk.WORD)
-        scrollbar = ttk.Scrollbar(results_frame, orient=tk.VERTICAL, command=self.results_text.yview)
+        self.results_notebook = ttk.Notebook(results_frame)
+        self.results_notebook.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+
+        text_frame = ttk.Frame(self.results_notebook)
+        text_frame.columnconfigure(0, weight=1)
+        text_frame.rowconfigure(0, weight=1)
+        self.results_notebook.add(text_frame, text="Summary")
+
+        self.results_text = tk.Text(text_frame, height=10, wrap=tk.WORD)
+        scrollbar = ttk.Scrollbar(text_frame, orient=tk.VERTICAL, command=self.results_text.yview)
         self.results_text.configure(yscrollcommand=scrollbar.set)
 
         self.results_text.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
 
+        # The plots tab is filled in the first time the analysis is plotted
+        self.plots_frame = ttk.Frame(self.results_notebook)
+        self.plots_frame.columnconfigure(0, weight=1)
+        self.plots_frame.rowconfigure(0, weight=1)
+        self.results_notebook.add(self.plots_frame, text="Plots")
+
+        # Annotated frames sent back by the tracking process
+        self.preview_frame = ttk.Frame(self.results_notebook)
+        self.preview_label = ttk.Label(self.preview_frame, anchor=tk.CENTER)
+        self.preview_label.pack(fill=tk.BOTH, expand=True)
+        self.results_notebook.add(self.preview_frame, text="Preview")
+
+    def start_warm_up(self):
+        thread = threading.Thread(target=self.warm_up)
+        thread.daemon = True
+        thread.start()
+
+    def warm_up(self):
+        import importlib
+
+        for name in WARM_UP_MODULES:
+            try:
+                importlib.import_module(name)
+            except Exception:
+                # Anything that fails here fails again, with an error
+                # shown, when it is actually used
+                return
+
+        from barbell_tracker import get_available_backends
+
+        backends = get_available_backends()
+        self.root.after(0, lambda: self.backend_combo.config(values=backends))
+
     def btn_browse_click(self):
         filetypes = [
             ("Video files", "*.mp4 *.avi *.mov *.mkv *.wmv"),
@@ -156,105 +299,302 @@ class BarbellGUI:
         if not os.path.exists(self.file_var.get()):
             return messagebox.showerror("Error", "Selected video file does not exist.")
 
-        # Start analysis in separate thread
-        thread = threading.Thread(target=self.analyze_video)
-        thread.daemon = True
-        thread.start()
-        self.sync_progress_bar(thread)
-    
+        if self.job is not None and self.job.is_running():
+            return
+
+        try:
+            self.start_tracking_job()
+        except Exception as e:
+            self.on_analysis_error(str(e))
+
+    def btn_cancel_click(self):
+        if self.job is not None and self.job.is_running():
+            self.job.cancel()
+            self.progress_var.set("Cancelling...")
+            self.cancel_btn.config(state="disabled")
+
+    def btn_reanalyse_click(self):
+        if self.analyser is None:
+            return messagebox.showerror("Error", "No tracking data available to re-analyse.")
+
+        # Apply the current smoothing settings to the existing tracker output
+        try:
+            self.analyser.update_settings(**self.get_analyser_settings())
+            self.show_results()
+        except Exception as e:
+            messagebox.showerror("Analysis Error", f"Error during analysis: {e}")
+
     def btn_plot_click(self):
-        if self.analyser is not None:
-            self.analyser.plot_data()
+        if self.analyser is None:
+            return
+
+        if self.plot_panel is None:
+            from barbell_plots import PlotPanel
+
+            self.plot_panel = PlotPanel(self.plots_frame)
+            self.plot_panel.grid()
+            self.root.geometry("1000x900")
+
+        self.results_notebook.select(self.plots_frame)
+        self.plot_panel.set_data(self.analyser)
     
     def btn_export_click(self):
         if self.analyser is None:
             return messagebox.showerror("Error", "No analysis data available to export.")
 
-        filetypes = [
-            ("CSV files", "*.csv"),
-            ("All files", "*.*")
-        ]
+        import barbell_exporter
+
+        filetypes = [("CSV files", "*.csv"), ("NumPy archives", "*.npz")]
+        if "parquet" in barbell_exporter.get_available_formats():
+            filetypes += [("Parquet files", "*.parquet"), ("Arrow files", "*.arrow")]
+        filetypes.append(("All files", "*.*"))
+
         save_path = filedialog.asksaveasfilename(
-            title="Export CSV",
+            title="Export Data",
             initialfile="barbell_data.csv",
             filetypes=filetypes
         )
         if save_path:
-            data = self.analyser.export_to_tuple()
-            with open(save_path, "w") as f:
-                for line in data:
-                    f.write(",".join(map(str, line)) + "\n")
+            try:
+                barbell_exporter.export_samples(self.analyser, save_path)
+
+                # Per-rep metrics go in a second file next to the samples
+                stem, extension = os.path.splitext(save_path)
+                barbell_exporter.export_reps(self.analyser, stem + "_reps" + extension)
+            except Exception as e:
+                messagebox.showerror("Export Error", f"Error during export: {e}")
+
+    def btn_auto_range_click(self):
+        if not self.file_var.get() or not os.path.exists(self.file_var.get()):
+            return messagebox.showerror("Error", "Please select a video file first.")
 
-    def analyze_video(self):
+        self.auto_range_btn.config(state="disabled")
+        self.progress_var.set("Finding where the bar moves...")
+
+        thread = threading.Thread(target=self.find_active_range, args=(self.file_var.get(),))
+        thread.daemon = True
+        thread.start()
+
+    def find_active_range(self, video_path):
         try:
-            self.tracker = BarbellTracker(
-                show_preview=self.show_preview_var.get(),
-                sample_interval=self.sample_interval_var.get(),
-                show_bar_path=self.show_bar_path_var.get(),
-                barbell_height_m=0.45,
-                match_threshold=0.3
-            )
-            self.root.after(0, lambda: self.on_analysis_start())
+            from barbell_tracker import find_active_range
 
-            positions, timestamps = self.tracker.track(self.file_var.get())
-            self.root.after(0, lambda: self.on_analysis_complete(positions, timestamps))
+            active_range = find_active_range(video_path)
+            self.root.after(0, lambda: self.on_active_range_found(active_range))
+        except Exception as e:
+            self.root.after(0, lambda err=str(e): self.on_active_range_found(None, err))
+
+    def on_active_range_found(self, active_range, error_msg=None):
+        self.auto_range_btn.config(state="normal")
+        if error_msg is not None:
+            self.progress_var.set("Ready")
+            return messagebox.showerror("Error", f"Could not scan video: {error_msg}")
+
+        if active_range is None:
+            self.progress_var.set("No distinct lifting window found; tracking the whole video.")
+            self.start_time_var.set("")
+            self.end_time_var.set("")
+            return
+
+        start_time, end_time = active_range
+        self.start_time_var.set(f"{start_time:.1f}")
+        self.end_time_var.set(f"{end_time:.1f}")
+        self.progress_var.set(f"Bar moves between {start_time:.1f} s and {end_time:.1f} s.")
+
+    def get_time_range(self):
+        bounds = []
+        for var in (self.start_time_var, self.end_time_var):
+            value = var.get().strip()
+            bounds.append(float(value) if value else None)
+        return bounds
+
+    def btn_save_click(self):
+        if self.analyser is None:
+            return messagebox.showerror("Error", "No analysis data available to save.")
+
+        if not self.athlete_var.get().strip() or not self.lift_var.get().strip():
+            return messagebox.showerror("Error", "Please enter an athlete and a lift first.")
 
+        from barbell_store import SessionStore
+
+        try:
+            with SessionStore() as store:
+                store.save_session(
+                    self.analyser,
+                    self.athlete_var.get().strip(),
+                    self.lift_var.get().strip(),
+                    video_path=self.file_var.get() or None
+                )
+            self.progress_var.set("Session saved.")
         except Exception as e:
-            self.root.after(0, lambda err=str(e): self.on_analysis_error(err))
+            messagebox.showerror("Save Error", f"Error saving session: {e}")
+
+    def start_tracking_job(self):
+        from barbell_cache import DEFAULT_CACHE_DIR
+        from barbell_streaming import StreamingAnalyser
 
-    def sync_progress_bar(self, thread):
-        if self.tracker:
-            self.progress_bar.config(value=self.tracker.current_frame)
-            self.progress_bar.config(maximum=self.tracker.num_frames)
-        if thread.is_alive():
-            self.root.after(100, lambda: self.sync_progress_bar(thread))
+        start_time, end_time = self.get_time_range()
+
+        self.stream_analyser = StreamingAnalyser(
+            window_length=self.smooth_window_length_var.get(),
+            polynomial_order=min(self.smooth_polynomial_order_var.get(), 2)
+        )
+
+        # Tracking runs in its own process so it can't stall or crash the GUI
+        self.job = TrackingJob(
+            self.file_var.get(),
+            {
+                "show_preview": self.show_preview_var.get(),
+                "sample_interval": self.sample_interval_var.get(),
+                "show_bar_path": self.show_bar_path_var.get(),
+                "barbell_height_m": 0.45,
+                "match_threshold": 0.3,
+                "predict_motion": self.predict_motion_var.get(),
+                "pyramid_levels": self.pyramid_levels_var.get(),
+                "color_space": "gray" if self.grayscale_matching_var.get() else "bgr",
+                "workers": self.workers_var.get(),
+                "backend": self.backend_var.get(),
+                "auto_detect": self.auto_detect_var.get(),
+            },
+            cache_dir=DEFAULT_CACHE_DIR,
+            start_time=start_time,
+            end_time=end_time
+        )
+        self.on_analysis_start()
+        self.job.start()
+        self.root.after(JOB_POLL_INTERVAL_MS, self.poll_job)
+
+    def poll_job(self):
+        job = self.job
+        for message in job.get_messages():
+            kind = message[0]
+            if kind == "progress":
+                self.on_job_progress(*message[1:])
+            elif kind == "result":
+                self.on_analysis_complete(message[1])
+            elif kind == "error":
+                self.on_analysis_error(message[1])
+            elif kind == "cancelled":
+                self.on_analysis_cancelled()
+
+        preview = job.get_preview()
+        if preview is not None:
+            self.preview_image = tk.PhotoImage(data=preview, format="PPM")
+            self.preview_label.config(image=self.preview_image)
+
+        if job.is_running():
+            self.root.after(JOB_POLL_INTERVAL_MS, self.poll_job)
+
+    def on_job_progress(self, current_frame, num_frames, pixels_per_meter, stats_summary, samples):
+        self.pixels_per_meter = pixels_per_meter
+        self.progress_bar.config(value=current_frame)
+        self.progress_bar.config(maximum=num_frames)
+        self.stats_var.set(stats_summary)
+
+        for timestamp, position in samples:
+            self.stream_analyser.add_position(timestamp, self.convert_position_px_to_m(position))
+
+        if self.stream_analyser.velocity is not None and self.job.cancel_time is None:
+            progress_text = f"Analysing video... Velocity: {self.stream_analyser.velocity:.2f} m/s"
+            if self.stream_analyser.reps:
+                rep = self.stream_analyser.reps[-1]
+                progress_text += f" | Rep {rep['rep']} peak: {rep['peak_velocity']:.2f} m/s"
+            self.progress_var.set(progress_text)
 
     def on_analysis_start(self):
         self.progress_var.set("Analysing video...")
         self.analyze_btn.config(state="disabled")
+        self.reanalyse_btn.config(state="disabled")
         self.plot_btn.config(state="disabled")
         self.export_btn.config(state="disabled")
+        self.save_btn.config(state="disabled")
+        self.cancel_btn.config(state="normal")
         self.progress_bar.config(value=0)
         self.results_text.delete(1.0, tk.END)
+        if self.show_preview_var.get():
+            self.results_notebook.select(self.preview_frame)
 
-    def on_analysis_complete(self, positions, timestamps):
+    def on_analysis_complete(self, result):
         self.progress_var.set("Analysis complete!")
+        detection = result["plate_detection"]
+        if detection is not None:
+            self.progress_var.set(f"Analysis complete! Plate detected with confidence {detection['confidence']:.2f}.")
         self.analyze_btn.config(state="normal")
+        self.reanalyse_btn.config(state="normal")
         self.plot_btn.config(state="normal")
         self.export_btn.config(state="normal")
+        self.save_btn.config(state="normal")
+        self.cancel_btn.config(state="disabled")
+        self.progress_bar.config(value=result["tracked_frames"], maximum=result["tracked_frames"])
 
         # Analyse position data
-        results_string = ""
         try:
-            positions_m = [self.convert_position_px_to_m(pos) for pos in positions]
-            self.analyser = BarbellAnalyser(
-                positions_m,
-                timestamps,
-                self.tracker.num_frames,
-                smooth_displacement=self.smooth_displacement_var.get(),
-                smooth_velocity=self.smooth_velocity_var.get(),
-                smooth_acceleration=self.smooth_acceleration_var.get(),
-                smooth_window_length=self.smooth_window_length_var.get(),
-                smooth_polynomial_order=self.smooth_polynomial_order_var.get()
+            from barbell_analyser import BarbellAnalyser
+            from barbell_trajectory import Trajectory
+
+            self.pixels_per_meter = result["pixels_per_meter"]
+            self.analyser = BarbellAnalyser.from_trajectory(
+                Trajectory.from_columns(**result["trajectory"]),
+                result["tracked_frames"],
+                self.pixels_per_meter,
+                **self.get_analyser_settings()
             )
-            results_string = self.analyser.get_results_string()
-
-            # Display results
-            self.results_text.insert(1.0, results_string)
+            self.results_notebook.select(0)
+            self.show_results()
         except Exception as e:
             self.on_analysis_error(str(e))
 
+    def get_analyser_settings(self):
+        return {
+            "smooth_displacement": self.smooth_displacement_var.get(),
+            "smooth_velocity": self.smooth_velocity_var.get(),
+            "smooth_acceleration": self.smooth_acceleration_var.get(),
+            "smooth_window_length": self.smooth_window_length_var.get(),
+            "smooth_polynomial_order": self.smooth_polynomial_order_var.get(),
+            "rep_min_range_m": self.rep_min_range_var.get(),
+        }
+
+    def show_results(self):
+        results_string = self.analyser.get_results_string()
+
+        # Display results
+        self.results_text.delete(1.0, tk.END)
+        self.results_text.insert(1.0, results_string)
+
+        # Plots already on screen are updated in place
+        if self.plot_panel is not None:
+            self.plot_panel.set_data(self.analyser)
+
     def on_analysis_error(self, error_msg):
         self.progress_var.set("Analysis failed!")
         self.analyze_btn.config(state="normal")
+        self.reanalyse_btn.config(state="normal")
         self.plot_btn.config(state="normal")
         self.export_btn.config(state="normal")
+        self.save_btn.config(state="normal")
+        self.cancel_btn.config(state="disabled")
         messagebox.showerror("Analysis Error", f"Error during analysis: {error_msg}")
 
+    def on_analysis_cancelled(self):
+        self.progress_var.set("Analysis cancelled.")
+        self.analyze_btn.config(state="normal")
+        self.reanalyse_btn.config(state="normal")
+        self.plot_btn.config(state="normal")
+        self.export_btn.config(state="normal")
+        self.save_btn.config(state="normal")
+        self.cancel_btn.config(state="disabled")
+
+    def on_close(self):
+        # A tracking process left running would keep the program alive
+        if self.job is not None:
+            self.job.cancel()
+            self.job.terminate()
+        self.root.destroy()
+
     def convert_position_px_to_m(self, position_px):
-        if self.tracker.pixels_per_meter > 0:
+        if self.pixels_per_meter:
             return (
-                position_px[0] / self.tracker.pixels_per_meter,
-                position_px[1] / self.tracker.pixels_per_meter
+                position_px[0] / self.pixels_per_meter,
+                position_px[1] / self.pixels_per_meter
             )
         return 0
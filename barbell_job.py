@@ -0,0 +1,384 @@
+"""
+This class is responsible for running the barbell tracker in a child process
+for the GUI. Progress, new positions and the final result are sent back over
+a message queue and the latest preview frame through shared memory, a run can
+be cancelled at any point, and a crash in the decoder only ends the child
+process. A TrackingWorker keeps one child process up to run many jobs in turn.
+"""
+
+import multiprocessing
+import queue
+import threading
+import time
+import traceback
+
+
+# Seconds between progress messages from the child process
+PROGRESS_INTERVAL = 0.1
+
+DEFAULT_PREVIEW_WIDTH = 480
+
+# Tallest preview, as a multiple of its width, that fits the shared buffer
+MAX_PREVIEW_ASPECT = 2
+
+# Room for the PPM header in front of the pixels
+PPM_HEADER_SIZE = 32
+
+# Seconds a cancelled child process gets to stop before it is terminated
+CANCEL_TIMEOUT = 5.0
+
+# Messages after which the child process sends nothing more for a job
+FINAL_MESSAGES = ("result", "error", "cancelled")
+
+# Seconds a worker process gets to exit after being asked to stop
+WORKER_STOP_TIMEOUT = 5.0
+
+
+class TrackingJob:
+    def __init__(
+            self,
+            video_path,
+            tracker_settings,
+            template_region=None,
+            template_image=None,
+            cache_dir=None,
+            preview_width=DEFAULT_PREVIEW_WIDTH,
+            start_time=None,
+            end_time=None,
+            worker=None):
+        self.video_path = video_path
+        self.tracker_settings = tracker_settings
+        self.template_region = template_region
+        self.template_image = template_image
+        self.cache_dir = cache_dir
+        self.preview_width = preview_width
+        self.start_time = start_time
+        self.end_time = end_time
+        self.worker = worker
+        self.process = None
+        self.messages = None
+        self.preview_buffer = None
+        self.preview_info = None
+        self.preview_sequence = 0
+        self.cancel_event = None
+        self.cancel_time = None
+        self.finished = False
+
+    def get_job_arguments(self):
+        return (
+            self.video_path, self.tracker_settings, self.template_region, self.template_image,
+            self.start_time, self.end_time, self.cache_dir, self.preview_width
+        )
+
+    def start(self):
+        if self.worker is not None:
+            self.start_on_worker()
+            return
+
+        # Forking a process that is running Tk isn't safe, so the child
+        # starts from a fresh interpreter
+        context = multiprocessing.get_context("spawn")
+        self.messages = context.Queue()
+        self.cancel_event = context.Event()
+
+        # Only the newest preview frame matters, so it's written over a
+        # single shared buffer instead of queued; preview_info holds the
+        # frame's sequence number and size
+        preview_size = PPM_HEADER_SIZE + self.preview_width * self.preview_width * MAX_PREVIEW_ASPECT * 3
+        self.preview_buffer = context.RawArray("B", preview_size)
+        self.preview_info = context.Array("q", 2)
+
+        self.process = context.Process(
+            target=run_tracking_job,
+            args=self.get_job_arguments() + (self.messages, self.preview_buffer, self.preview_info, self.cancel_event)
+        )
+        self.process.start()
+
+    def start_on_worker(self):
+        # The job shares the worker's process, queues and preview buffer;
+        # its own number keeps a late cancel from reaching the next job
+        worker = self.worker
+        worker.start()
+        job_number = worker.get_next_job_number()
+
+        self.preview_width = min(self.preview_width, worker.preview_width)
+        self.process = worker.process
+        self.messages = worker.messages
+        self.preview_buffer = worker.preview_buffer
+        self.preview_info = worker.preview_info
+        self.preview_sequence = worker.preview_info[0]
+        self.cancel_event = JobCancelFlag(worker.cancelled_job, job_number)
+
+        worker.requests.put((job_number, self.get_job_arguments()))
+
+    def cancel(self):
+        if self.cancel_event is not None and self.cancel_time is None:
+            self.cancel_event.set()
+            self.cancel_time = time.monotonic()
+
+    def terminate(self):
+        if self.process is not None and self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+
+    def is_running(self):
+        return self.process is not None and not self.finished
+
+    def get_messages(self):
+        if self.process is None or self.finished:
+            return []
+
+        messages = self.drain_messages()
+
+        if not self.finished and self.process.exitcode is not None:
+            # Anything sent just before the child exited is still in the pipe
+            messages += self.drain_messages()
+            if not self.finished:
+                messages.append(("error", f"Tracking process exited unexpectedly (exit code {self.process.exitcode}).", None))
+                self.finished = True
+
+        if not self.finished and self.cancel_time is not None and time.monotonic() - self.cancel_time > CANCEL_TIMEOUT:
+            self.terminate()
+            messages.append(("cancelled",))
+            self.finished = True
+
+        # A worker's process stays up for its next job
+        if self.finished and self.worker is None:
+            self.process.join(CANCEL_TIMEOUT)
+            self.terminate()
+
+        return messages
+
+    def drain_messages(self):
+        messages = []
+        while True:
+            try:
+                message = self.messages.get_nowait()
+            except queue.Empty:
+                break
+
+            messages.append(message)
+            if message[0] in FINAL_MESSAGES:
+                self.finished = True
+
+        return messages
+
+    def get_preview(self):
+        # Returns the newest preview frame as PPM data, or None if it has
+        # already been shown
+        if self.preview_info is None:
+            return None
+
+        with self.preview_info.get_lock():
+            sequence, size = self.preview_info[:]
+            if sequence == self.preview_sequence:
+                return None
+            self.preview_sequence = sequence
+            return bytes(memoryview(self.preview_buffer).cast("B")[:size])
+
+
+class JobCancelFlag:
+    # Stands in for an Event when cancelling one of the jobs a worker runs:
+    # setting it records the job's number, so it only ever cancels that job
+    def __init__(self, cancelled_job, job_number):
+        self.cancelled_job = cancelled_job
+        self.job_number = job_number
+
+    def set(self):
+        self.cancelled_job.value = self.job_number
+
+    def is_set(self):
+        return self.cancelled_job.value == self.job_number
+
+
+class TrackingWorker:
+    def __init__(self, preview_width=DEFAULT_PREVIEW_WIDTH):
+        self.preview_width = preview_width
+        self.process = None
+        self.requests = None
+        self.messages = None
+        self.preview_buffer = None
+        self.preview_info = None
+        self.cancelled_job = None
+        self.job_count = 0
+
+    def start(self):
+        # A process that crashed or was terminated is replaced, along with
+        # its queues, so nothing left over from it reaches the next job
+        if self.process is not None and self.process.is_alive():
+            return
+
+        context = multiprocessing.get_context("spawn")
+        self.requests = context.Queue()
+        self.messages = context.Queue()
+        self.cancelled_job = context.Value("q", 0, lock=False)
+
+        preview_size = PPM_HEADER_SIZE + self.preview_width * self.preview_width * MAX_PREVIEW_ASPECT * 3
+        self.preview_buffer = context.RawArray("B", preview_size)
+        self.preview_info = context.Array("q", 2)
+
+        self.process = context.Process(
+            target=run_tracking_worker,
+            args=(self.requests, self.messages, self.preview_buffer, self.preview_info, self.cancelled_job),
+            daemon=True
+        )
+        self.process.start()
+
+    def get_next_job_number(self):
+        self.job_count += 1
+        return self.job_count
+
+    def stop(self):
+        if self.process is None:
+            return
+
+        if self.process.is_alive():
+            self.requests.put(None)
+            self.process.join(WORKER_STOP_TIMEOUT)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+
+
+def encode_preview(frame, width):
+    import cv2
+
+    frame_height, frame_width = frame.shape[:2]
+    height = max(int(frame_height * width / frame_width), 1)
+    if height > width * MAX_PREVIEW_ASPECT:
+        height = width * MAX_PREVIEW_ASPECT
+        width = max(int(frame_width * height / frame_height), 1)
+
+    frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+    frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+    # Binary PPM can be loaded straight into a Tk PhotoImage
+    return b"P6 %d %d 255\n" % (width, height) + frame.tobytes()
+
+
+def write_preview(preview_buffer, preview_info, data):
+    with preview_info.get_lock():
+        memoryview(preview_buffer).cast("B")[:len(data)] = data
+        preview_info[0] += 1
+        preview_info[1] = len(data)
+
+
+def report_progress(tracker, messages, cancel_event, done):
+    trajectory = None
+    samples_sent = 0
+    while True:
+        finished = done.wait(PROGRESS_INTERVAL)
+
+        # tracker.track resets its stop event, so keep passing the
+        # cancellation on until the run has finished
+        if cancel_event.is_set():
+            tracker.stop()
+
+        # A cached or parallel run replaces the trajectory when it finishes
+        if tracker.trajectory is not trajectory:
+            trajectory = tracker.trajectory
+            samples_sent = 0
+
+        columns = trajectory.get_columns()
+        valid = columns["valid"][samples_sent:]
+        new_samples = list(zip(
+            columns["timestamps"][samples_sent:][valid].tolist(),
+            map(tuple, columns["positions"][samples_sent:][valid].tolist())
+        ))
+        samples_sent = len(columns["valid"])
+
+        # Progress counts frames within the tracked range
+        messages.put((
+            "progress",
+            max(tracker.current_frame - tracker.start_frame, 0),
+            tracker.get_tracked_frame_count(),
+            tracker.pixels_per_meter,
+            tracker.stats.get_summary_string(),
+            new_samples,
+        ))
+
+        if finished:
+            return
+
+
+def run_tracking_job(
+        video_path,
+        tracker_settings,
+        template_region,
+        template_image,
+        start_time,
+        end_time,
+        cache_dir,
+        preview_width,
+        messages,
+        preview_buffer,
+        preview_info,
+        cancel_event):
+    done = threading.Event()
+    reporter = None
+    try:
+        from barbell_tracker import BarbellTracker
+        from barbell_cache import TrackingCache
+
+        def send_preview(frame):
+            write_preview(preview_buffer, preview_info, encode_preview(frame, preview_width))
+
+        tracker = BarbellTracker(
+            cache=TrackingCache(cache_dir) if cache_dir else None,
+            on_preview=send_preview if tracker_settings.get("show_preview", True) else None,
+            **tracker_settings
+        )
+
+        reporter = threading.Thread(target=report_progress, args=(tracker, messages, cancel_event, done), daemon=True)
+        reporter.start()
+
+        try:
+            tracker.track(
+                video_path,
+                template_region=template_region,
+                template_image=template_image,
+                start_time=start_time,
+                end_time=end_time
+            )
+        finally:
+            done.set()
+            reporter.join()
+
+        if cancel_event.is_set() or tracker.cancelled:
+            messages.put(("cancelled",))
+            return
+
+        messages.put((
+            "result",
+            {
+                "trajectory": tracker.trajectory.get_columns(),
+                "fps": tracker.fps,
+                "num_frames": tracker.num_frames,
+                "tracked_frames": tracker.get_tracked_frame_count(),
+                "pixels_per_meter": tracker.pixels_per_meter,
+                "plate_detection": tracker.detection,
+                "stats": tracker.stats.get_snapshot(),
+            },
+        ))
+    except Exception as e:
+        done.set()
+        if cancel_event.is_set():
+            messages.put(("cancelled",))
+        else:
+            messages.put(("error", str(e), traceback.format_exc()))
+
+
+def run_tracking_worker(requests, messages, preview_buffer, preview_info, cancelled_job):
+    # OpenCV is imported before the first job arrives, so no job waits on it
+    import barbell_tracker
+
+    while True:
+        request = requests.get()
+        if request is None:
+            return
+
+        job_number, job_arguments = request
+        run_tracking_job(
+            *job_arguments, messages, preview_buffer, preview_info,
+            JobCancelFlag(cancelled_job, job_number)
+        )
@@ -0,0 +1,190 @@
+"""
+This class is responsible for drawing the barbell analysis plots inside the
+Tk GUI. Each series is decimated to the on-screen width of its axes with
+min/max binning, and updates are blitted in place instead of rebuilding the
+figure.
+"""
+
+import numpy as np
+
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+
+
+# Fraction of the data range left as padding around each plot
+AXIS_MARGIN = 0.05
+
+
+def get_decimation_indices(values, num_bins):
+    # Keep the smallest and largest sample of each bin, in time order, so
+    # peaks survive decimation whatever the zoom level
+    num_values = len(values)
+    if num_values <= 2 * num_bins:
+        return np.arange(num_values)
+
+    bin_size = -(-num_values // num_bins)
+    num_bins = -(-num_values // bin_size)
+    padded = np.empty(num_bins * bin_size)
+    padded[:num_values] = values
+    padded[num_values:] = values[-1]
+    padded = np.nan_to_num(padded, nan=np.nanmean(values) if np.isfinite(values).any() else 0.0)
+
+    bins = padded.reshape(num_bins, bin_size)
+    offsets = np.arange(num_bins) * bin_size
+    min_indices = offsets + np.argmin(bins, axis=1)
+    max_indices = offsets + np.argmax(bins, axis=1)
+
+    indices = np.sort(np.stack([min_indices, max_indices], axis=1), axis=1).ravel()
+    return np.minimum(indices, num_values - 1)
+
+
+class PlotPanel:
+    def __init__(self, parent):
+        self.figure = Figure(figsize=(9, 6), dpi=100)
+        axes = self.figure.subplots(2, 2)
+        self.axes = {
+            "displacement": axes[0, 0],
+            "velocity": axes[0, 1],
+            "acceleration": axes[1, 0],
+            "path": axes[1, 1],
+        }
+
+        self.configure_axes(self.axes["displacement"], "Time (s)", "Barbell Vertical Displacement (m)", "Barbell Vertical Displacement Over Time")
+        self.configure_axes(self.axes["velocity"], "Time (s)", "Barbell Vertical Velocity (m/s)", "Barbell Vertical Velocity Over Time")
+        self.configure_axes(self.axes["acceleration"], "Time (s)", "Barbell Vertical Acceleration (m/s²)", "Barbell Vertical Acceleration Over Time")
+        self.configure_axes(self.axes["path"], "Barbell Horizontal Displacement (m)", "Barbell Vertical Displacement (m)", "Barbell Path")
+
+        # Animated artists are left out of full redraws and blitted on top
+        self.lines = {
+            name: axis.plot([], [], animated=True)[0]
+            for name, axis in self.axes.items()
+        }
+        self.start_text = self.axes["path"].text(0, 0, "Start", fontsize=10, verticalalignment='center', animated=True)
+        self.end_text = self.axes["path"].text(0, 0, "End", fontsize=10, verticalalignment='center', animated=True)
+        self.figure.tight_layout()
+
+        self.canvas = FigureCanvasTkAgg(self.figure, master=parent)
+        self.toolbar = NavigationToolbar2Tk(self.canvas, parent, pack_toolbar=False)
+        self.widget = self.canvas.get_tk_widget()
+
+        self.series = None
+        self.background = None
+        self.updating_limits = False
+        self.canvas.mpl_connect("draw_event", self.on_draw)
+        self.canvas.mpl_connect("resize_event", self.on_resize)
+        for name in ("displacement", "velocity", "acceleration"):
+            self.axes[name].callbacks.connect("xlim_changed", self.on_xlim_changed)
+
+    def configure_axes(self, axis, xlabel, ylabel, title):
+        axis.set_xlabel(xlabel)
+        axis.set_ylabel(ylabel)
+        axis.set_title(title)
+        axis.grid()
+
+    def grid(self, **kwargs):
+        self.widget.grid(row=0, column=0, sticky="NSEW", **kwargs)
+        self.toolbar.grid(row=1, column=0, sticky="EW")
+
+    def set_data(self, analyser):
+        displacements = analyser.displacements
+        self.series = {
+            "timestamps": analyser.timestamps,
+            "displacement": displacements[:, 1],
+            "velocity": analyser.velocities,
+            "acceleration": analyser.accelerations,
+            "path_x": displacements[:, 0],
+        }
+
+        if len(analyser.timestamps) > 0:
+            self.start_text.set_position((displacements[0, 0], displacements[0, 1]))
+            self.end_text.set_position((displacements[-1, 0], displacements[-1, 1]))
+
+        if self.update_limits():
+            # New limits mean new ticks, so the static background must be redrawn
+            self.refresh_lines()
+            self.canvas.draw_idle()
+        else:
+            self.refresh_lines()
+            self.blit()
+
+    def update_limits(self):
+        limits = {
+            "displacement": (self.series["timestamps"], self.series["displacement"]),
+            "velocity": (self.series["timestamps"], self.series["velocity"]),
+            "acceleration": (self.series["timestamps"], self.series["acceleration"]),
+            "path": (self.series["path_x"], self.series["displacement"]),
+        }
+
+        changed = False
+        self.updating_limits = True
+        for name, (xs, ys) in limits.items():
+            new_xlim = self.get_padded_range(xs)
+            new_ylim = self.get_padded_range(ys)
+            axis = self.axes[name]
+            if new_xlim is None or new_ylim is None:
+                continue
+            if not np.allclose(axis.get_xlim(), new_xlim) or not np.allclose(axis.get_ylim(), new_ylim):
+                axis.set_xlim(new_xlim)
+                axis.set_ylim(new_ylim)
+                changed = True
+        self.updating_limits = False
+
+        return changed
+
+    def get_padded_range(self, values):
+        finite = values[np.isfinite(values)]
+        if len(finite) == 0:
+            return None
+
+        low, high = float(finite.min()), float(finite.max())
+        margin = (high - low) * AXIS_MARGIN or 0.5
+        return (low - margin, high + margin)
+
+    def refresh_lines(self):
+        if self.series is None:
+            return
+
+        timestamps = self.series["timestamps"]
+        for name in ("displacement", "velocity", "acceleration"):
+            axis = self.axes[name]
+
+            # Only the visible time range is decimated, so zooming in shows
+            # full detail
+            xmin, xmax = axis.get_xlim()
+            start = max(np.searchsorted(timestamps, xmin) - 1, 0)
+            end = min(np.searchsorted(timestamps, xmax) + 1, len(timestamps))
+            values = self.series[name][start:end]
+
+            indices = start + get_decimation_indices(values, max(int(axis.bbox.width), 100))
+            self.lines[name].set_data(timestamps[indices], self.series[name][indices])
+
+        # The bar path isn't ordered along x, so bin it by time instead
+        indices = get_decimation_indices(self.series["displacement"], max(int(self.axes["path"].bbox.width), 100))
+        self.lines["path"].set_data(self.series["path_x"][indices], self.series["displacement"][indices])
+
+    def on_draw(self, event):
+        self.background = self.canvas.copy_from_bbox(self.figure.bbox)
+        self.draw_artists()
+
+    def on_resize(self, event):
+        self.refresh_lines()
+
+    def on_xlim_changed(self, axis):
+        if not self.updating_limits:
+            self.refresh_lines()
+
+    def draw_artists(self):
+        for line in self.lines.values():
+            self.figure.draw_artist(line)
+        if self.series is not None and len(self.series["timestamps"]) > 0:
+            self.figure.draw_artist(self.start_text)
+            self.figure.draw_artist(self.end_text)
+
+    def blit(self):
+        if self.background is None:
+            self.canvas.draw_idle()
+            return
+
+        self.canvas.restore_region(self.background)
+        self.draw_artists()
+        self.canvas.blit(self.figure.bbox)
@@ -0,0 +1,606 @@
+"""
+This module is responsible for serving clip analysis over HTTP on the local
+machine. Uploaded clips are queued and tracked by a bounded pool of workers,
+each running its jobs in a tracking process that stays up between clips, and
+clients poll job status, stream progress as server-sent events and fetch
+results as JSON:
+
+    POST   /jobs?region=x,y,w,h     upload a clip as the request body
+    GET    /jobs/<id>               job status and progress
+    GET    /jobs/<id>/events        progress as a server-sent event stream
+    GET    /jobs/<id>/result        tracking and analysis results
+    DELETE /jobs/<id>               cancel a queued or running job
+    GET    /jobs, /health           all jobs, and queue and worker load
+"""
+
+import hashlib
+import json
+import os
+import queue
+import re
+import shutil
+import tempfile
+import threading
+import time
+import urllib.parse
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from barbell_analyser import BarbellAnalyser
+from barbell_batch import VIDEO_EXTENSIONS, get_json_results
+from barbell_cache import DEFAULT_CACHE_DIR, TrackingCache
+from barbell_job import TrackingJob, TrackingWorker
+from barbell_streaming import StreamingAnalyser
+from barbell_tracker import BACKEND_NAMES, COLOR_CONVERSIONS
+from barbell_trajectory import Trajectory
+
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+DEFAULT_MAX_UPLOAD_BYTES = 1024 * 1024 * 1024
+UPLOAD_BLOCK_SIZE = 1024 * 1024
+
+# Seconds between checks for messages from a job's tracking process
+JOB_POLL_INTERVAL = 0.05
+
+# Seconds between keep-alive comments on an idle event stream
+EVENT_KEEPALIVE_INTERVAL = 15.0
+
+# Finished jobs kept for clients to fetch before the oldest are forgotten
+MAX_FINISHED_JOBS = 100
+
+FINAL_STATES = ("done", "failed", "cancelled")
+
+# Query parameters a clip can be submitted with, and their types
+TRACKER_PARAMETERS = {
+    "sample_interval": int,
+    "barbell_height_m": float,
+    "match_threshold": float,
+    "pyramid_levels": int,
+    "color_space": str,
+    "backend": str,
+    "reanchor_interval": int,
+    "detection_threshold": float,
+}
+ANALYSER_PARAMETERS = {
+    "smooth_window_length": int,
+    "smooth_polynomial_order": int,
+    "rep_min_range_m": float,
+}
+OTHER_PARAMETERS = ("region", "start_time", "end_time", "filename")
+
+JOB_PATH = re.compile(r"^/jobs/([0-9a-f]+)(/events|/result)?$")
+
+
+class ServiceJob:
+    def __init__(self, video_path, template_region=None, tracker_settings=None, analyser_settings=None, start_time=None, end_time=None):
+        self.id = uuid.uuid4().hex
+        self.video_path = video_path
+        self.template_region = template_region
+        self.tracker_settings = tracker_settings or {}
+        self.analyser_settings = analyser_settings or {}
+        self.start_time = start_time
+        self.end_time = end_time
+
+        self.state = "queued"
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.progress = {"frames_done": 0, "total_frames": 0, "velocity": None, "rep_count": 0, "stats": ""}
+        self.result = None
+        self.error = None
+        self.cancel_requested = False
+        self.tracking_job = None
+
+        # Every change bumps the version and wakes event streams
+        self.version = 0
+        self.condition = threading.Condition()
+
+    def update(self, **changes):
+        with self.condition:
+            for name, value in changes.items():
+                setattr(self, name, value)
+            self.version += 1
+            self.condition.notify_all()
+
+    def get_status(self):
+        with self.condition:
+            return {
+                "id": self.id,
+                "state": self.state,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "progress": dict(self.progress),
+                "error": self.error,
+            }
+
+    def wait_for_update(self, version, timeout):
+        # Returns the new version, or the same one if nothing changed in time
+        with self.condition:
+            self.condition.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+
+class JobService:
+    def __init__(self, workers=2, queue_size=8, cache_dir=DEFAULT_CACHE_DIR, upload_dir=None, max_finished_jobs=MAX_FINISHED_JOBS):
+        self.cache_dir = cache_dir
+        self.cache = TrackingCache(cache_dir) if cache_dir else None
+        self.max_finished_jobs = max_finished_jobs
+
+        # A temporary upload directory is removed again on shutdown
+        self.owns_upload_dir = upload_dir is None
+        self.upload_dir = upload_dir or tempfile.mkdtemp(prefix="barbell_uploads_")
+        os.makedirs(self.upload_dir, exist_ok=True)
+
+        # The queue bound is the backpressure: submissions beyond it are
+        # turned away instead of piling up on disk
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+        # Each worker keeps its own tracking process, so only the first job
+        # pays for starting an interpreter and importing OpenCV, and a
+        # cached clip is answered without that wait
+        self.tracking_workers = [TrackingWorker() for _ in range(workers)]
+        self.workers = [
+            threading.Thread(target=self.run_worker, args=(tracking_worker,), daemon=True)
+            for tracking_worker in self.tracking_workers
+        ]
+        for tracking_worker, worker in zip(self.tracking_workers, self.workers):
+            tracking_worker.start()
+            worker.start()
+
+    def is_full(self):
+        return self.queue.full()
+
+    def get_upload_path(self, filename=None):
+        extension = os.path.splitext(filename or "")[1].lower()
+        if extension not in VIDEO_EXTENSIONS:
+            extension = ".mp4"
+        return os.path.join(self.upload_dir, uuid.uuid4().hex + extension)
+
+    def add_upload(self, video_path, video_hash):
+        # The hash taken while the clip was received spares the cache from
+        # reading it back to hash it again
+        if self.cache is not None:
+            self.cache.set_video_hash(video_path, video_hash)
+
+    def submit(self, job):
+        # Returns False when the queue is full
+        with self.lock:
+            try:
+                self.queue.put_nowait(job)
+            except queue.Full:
+                return False
+            self.jobs[job.id] = job
+
+        return True
+
+    def get_job(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def get_jobs(self):
+        with self.lock:
+            return list(self.jobs.values())
+
+    def get_job_status(self, job):
+        status = job.get_status()
+        if status["state"] == "queued":
+            with self.queue.mutex:
+                pending = [queued for queued in self.queue.queue if queued is not None and not queued.cancel_requested]
+            status["queue_position"] = pending.index(job) + 1 if job in pending else None
+        return status
+
+    def get_health(self):
+        states = [job.state for job in self.get_jobs()]
+        return {
+            "workers": len(self.workers),
+            "queue_size": self.queue.maxsize,
+            "queued": states.count("queued"),
+            "running": states.count("running"),
+            "finished": sum(state in FINAL_STATES for state in states),
+        }
+
+    def cancel(self, job):
+        # Returns False when the job had already finished
+        with job.condition:
+            if job.state in FINAL_STATES:
+                return False
+            job.cancel_requested = True
+            queued = job.state == "queued"
+            if queued:
+                job.update(state="cancelled", finished_at=time.time())
+
+        # A queued job is skipped when a worker reaches it; a running one
+        # is stopped through its tracking process
+        if queued:
+            self.finish_job(job)
+        elif job.tracking_job is not None:
+            job.tracking_job.cancel()
+
+        return True
+
+    def run_worker(self, tracking_worker):
+        while True:
+            job = self.queue.get()
+            if job is None:
+                return
+
+            try:
+                if self.start_job(job, tracking_worker):
+                    self.run_job(job)
+            except Exception as e:
+                job.update(state="failed", error=str(e), finished_at=time.time())
+            finally:
+                # A job that didn't finish takes its process down with it,
+                # and the worker starts a new one for the next job
+                if job.tracking_job is not None and job.tracking_job.is_running():
+                    job.tracking_job.terminate()
+                self.finish_job(job)
+
+    def start_job(self, job, tracking_worker):
+        # Returns False for a job cancelled while it was queued
+        with job.condition:
+            if job.cancel_requested:
+                return False
+
+            tracker_settings = dict(
+                job.tracker_settings,
+                show_preview=False,
+                workers=1,
+                auto_detect=True,
+                manual_fallback=False
+            )
+            job.tracking_job = TrackingJob(
+                job.video_path,
+                tracker_settings,
+                template_region=job.template_region,
+                cache_dir=self.cache_dir,
+                start_time=job.start_time,
+                end_time=job.end_time,
+                worker=tracking_worker
+            )
+            job.tracking_job.start()
+            job.update(state="running", started_at=time.time())
+
+        return True
+
+    def run_job(self, job):
+        tracking_job = job.tracking_job
+        stream_analyser = StreamingAnalyser()
+
+        while True:
+            for message in tracking_job.get_messages():
+                kind = message[0]
+                if kind == "progress":
+                    self.on_job_progress(job, stream_analyser, *message[1:])
+                elif kind == "result":
+                    result = self.get_result(job, message[1])
+                    job.update(state="done", result=result, finished_at=time.time())
+                elif kind == "error":
+                    job.update(state="failed", error=message[1], finished_at=time.time())
+                elif kind == "cancelled":
+                    job.update(state="cancelled", finished_at=time.time())
+
+            if not tracking_job.is_running():
+                return
+            time.sleep(JOB_POLL_INTERVAL)
+
+    def on_job_progress(self, job, stream_analyser, frames_done, total_frames, pixels_per_meter, stats_summary, samples):
+        if pixels_per_meter:
+            for timestamp, (x, y) in samples:
+                stream_analyser.add_position(timestamp, (x / pixels_per_meter, y / pixels_per_meter))
+
+        job.update(progress={
+            "frames_done": frames_done,
+            "total_frames": total_frames,
+            "velocity": stream_analyser.velocity,
+            "rep_count": len(stream_analyser.reps),
+            "stats": stats_summary,
+        })
+
+    def get_result(self, job, result):
+        analyser = BarbellAnalyser.from_trajectory(
+            Trajectory.from_columns(**result["trajectory"]),
+            result["tracked_frames"],
+            result["pixels_per_meter"],
+            **job.analyser_settings
+        )
+        results, reps = get_json_results(analyser)
+
+        return {
+            "id": job.id,
+            "fps": result["fps"],
+            "num_frames": result["num_frames"],
+            "tracked_frames": result["tracked_frames"],
+            "pixels_per_meter": result["pixels_per_meter"],
+            "plate_detection": result["plate_detection"],
+            "results": results,
+            "reps": reps,
+            "tracker_stats": result["stats"],
+            "timestamps": analyser.timestamps.tolist(),
+            "positions": analyser.positions.tolist(),
+            "rejected_frames": analyser.rejected_frames.tolist(),
+        }
+
+    def finish_job(self, job):
+        # The upload is only needed while tracking; a repeat upload of the
+        # same clip is still served from the tracking cache
+        if self.cache is not None:
+            self.cache.forget_video_hash(job.video_path)
+        try:
+            os.remove(job.video_path)
+        except OSError:
+            pass
+
+        with self.lock:
+            finished = [job for job in self.jobs.values() if job.state in FINAL_STATES]
+            finished.sort(key=lambda job: job.finished_at)
+            for old_job in finished[:max(len(finished) - self.max_finished_jobs, 0)]:
+                del self.jobs[old_job.id]
+
+    def shutdown(self):
+        for job in self.get_jobs():
+            self.cancel(job)
+
+        for _ in self.workers:
+            self.queue.put(None)
+        for worker in self.workers:
+            worker.join()
+        for tracking_worker in self.tracking_workers:
+            tracking_worker.stop()
+
+        if self.owns_upload_dir:
+            shutil.rmtree(self.upload_dir, ignore_errors=True)
+
+
+class ServiceRequestHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 lets clients send "Expect: 100-continue" and be turned away
+    # before uploading a clip the queue has no room for
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def log_message(self, format, *args):
+        if self.server.log_requests:
+            super().log_message(format, *args)
+
+    def handle_expect_100(self):
+        if self.command == "POST" and self.service.is_full():
+            self.close_connection = True
+            self.send_queue_full()
+            return False
+
+        return super().handle_expect_100()
+
+    def do_GET(self):
+        path = urllib.parse.urlsplit(self.path).path
+        if path == "/health":
+            self.send_json(200, self.service.get_health())
+            return
+
+        if path == "/jobs":
+            self.send_json(200, {"jobs": [self.service.get_job_status(job) for job in self.service.get_jobs()]})
+            return
+
+        job, action = self.get_job_from_path(path)
+        if job is None:
+            return
+
+        if action is None:
+            self.send_json(200, self.service.get_job_status(job))
+        elif action == "/events":
+            self.stream_events(job)
+        elif job.state == "done":
+            self.send_json(200, job.result)
+        else:
+            self.send_json(409, dict(self.service.get_job_status(job), message="The job has no result yet."))
+
+    def do_POST(self):
+        split = urllib.parse.urlsplit(self.path)
+        length = self.headers.get("Content-Length")
+        if length is None or not length.isdigit():
+            self.close_connection = True
+            self.send_json(411, {"message": "Upload the clip as a request body with a Content-Length."})
+            return
+
+        length = int(length)
+        if length > self.server.max_upload_bytes:
+            self.close_connection = True
+            self.send_json(413, {"message": f"Clips are limited to {self.server.max_upload_bytes} bytes."})
+            return
+
+        # Clients that didn't wait for "100 Continue" have sent the clip
+        # anyway, so a refused upload is read and dropped for them to get
+        # the response
+        if split.path != "/jobs":
+            self.read_upload(None, length)
+            self.send_json(404, {"message": f"Unknown path: {split.path}"})
+            return
+
+        try:
+            parameters = parse_submission(split.query)
+        except ValueError as e:
+            self.read_upload(None, length)
+            self.send_json(400, {"message": str(e)})
+            return
+
+        if self.service.is_full():
+            self.read_upload(None, length)
+            self.send_queue_full()
+            return
+
+        video_path = self.service.get_upload_path(parameters.pop("filename"))
+        video_hash = self.read_upload(video_path, length)
+        if video_hash is None:
+            self.send_json(400, {"message": "The upload ended before Content-Length bytes were sent."})
+            return
+        self.service.add_upload(video_path, video_hash)
+
+        job = ServiceJob(video_path, **parameters)
+        if not self.service.submit(job):
+            self.service.finish_job(job)
+            self.send_queue_full()
+            return
+
+        self.send_json(202, self.service.get_job_status(job), {"Location": f"/jobs/{job.id}"})
+
+    def do_DELETE(self):
+        job, action = self.get_job_from_path(urllib.parse.urlsplit(self.path).path)
+        if job is None:
+            return
+
+        if action is not None or not self.service.cancel(job):
+            self.send_json(409, dict(self.service.get_job_status(job), message="The job has already finished."))
+            return
+
+        self.send_json(200, self.service.get_job_status(job))
+
+    def get_job_from_path(self, path):
+        match = JOB_PATH.match(path)
+        job = self.service.get_job(match.group(1)) if match else None
+        if job is None:
+            self.send_json(404, {"message": f"No job at {path}"})
+            return None, None
+
+        return job, match.group(2)
+
+    def read_upload(self, video_path, length):
+        # Returns the SHA-256 of the body, hashed as it streams to disk, or
+        # None if it was cut short. Without a path the body is discarded.
+        digest = hashlib.sha256() if video_path is not None else None
+        remaining = length
+        with open(video_path or os.devnull, "wb") as f:
+            while remaining > 0:
+                block = self.rfile.read(min(UPLOAD_BLOCK_SIZE, remaining))
+                if not block:
+                    break
+                f.write(block)
+                if digest is not None:
+                    digest.update(block)
+                remaining -= len(block)
+
+        if remaining > 0:
+            self.close_connection = True
+            if video_path is not None:
+                os.remove(video_path)
+            return None
+
+        return digest.hexdigest() if digest is not None else ""
+
+    def stream_events(self, job):
+        # Each change to the job is sent as an event named after its state,
+        # until the job finishes
+        self.close_connection = True
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+
+        version = None
+        try:
+            while True:
+                new_version = job.wait_for_update(version, EVENT_KEEPALIVE_INTERVAL)
+                if new_version == version:
+                    self.wfile.write(b": keep-alive\n\n")
+                else:
+                    version = new_version
+                    status = self.service.get_job_status(job)
+                    self.wfile.write(f"event: {status['state']}\ndata: {json.dumps(status)}\n\n".encode())
+                self.wfile.flush()
+
+                if status["state"] in FINAL_STATES:
+                    return
+        except (BrokenPipeError, ConnectionResetError):
+            return
+
+    def send_queue_full(self):
+        self.send_json(503, {"message": "The job queue is full, try again later."}, {"Retry-After": "5"})
+
+    def send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def parse_submission(query):
+    values = {name: values[-1] for name, values in urllib.parse.parse_qs(query).items()}
+    unknown = set(values) - set(TRACKER_PARAMETERS) - set(ANALYSER_PARAMETERS) - set(OTHER_PARAMETERS)
+    if unknown:
+        raise ValueError(f"Unknown parameters: {', '.join(sorted(unknown))}")
+
+    def convert(name, kind):
+        try:
+            return kind(values[name])
+        except ValueError:
+            raise ValueError(f"Invalid value for {name}: {values[name]}")
+
+    tracker_settings = {name: convert(name, kind) for name, kind in TRACKER_PARAMETERS.items() if name in values}
+    analyser_settings = {name: convert(name, kind) for name, kind in ANALYSER_PARAMETERS.items() if name in values}
+    if tracker_settings.get("backend", "template") not in BACKEND_NAMES:
+        raise ValueError(f"Unknown tracking backend: {tracker_settings['backend']}")
+    if tracker_settings.get("color_space", "bgr") not in COLOR_CONVERSIONS:
+        raise ValueError(f"Unknown colour space: {tracker_settings['color_space']}")
+
+    # Without a region the plate is detected in the first frame
+    template_region = None
+    if "region" in values:
+        try:
+            template_region = tuple(int(value) for value in values["region"].split(","))
+        except ValueError:
+            template_region = ()
+        if len(template_region) != 4 or min(template_region) < 0 or 0 in template_region[2:]:
+            raise ValueError("The region must be given as x,y,w,h in pixels.")
+
+    return {
+        "template_region": template_region,
+        "tracker_settings": tracker_settings,
+        "analyser_settings": analyser_settings,
+        "start_time": convert("start_time", float) if "start_time" in values else None,
+        "end_time": convert("end_time", float) if "end_time" in values else None,
+        "filename": values.get("filename"),
+    }
+
+
+def create_server(service, host=DEFAULT_HOST, port=DEFAULT_PORT, max_upload_bytes=DEFAULT_MAX_UPLOAD_BYTES, log_requests=False):
+    server = ThreadingHTTPServer((host, port), ServiceRequestHandler)
+    server.service = service
+    server.max_upload_bytes = max_upload_bytes
+    server.log_requests = log_requests
+    return server
+
+
+def run_server(
+        host=DEFAULT_HOST,
+        port=DEFAULT_PORT,
+        workers=2,
+        queue_size=8,
+        cache_dir=DEFAULT_CACHE_DIR,
+        upload_dir=None,
+        max_upload_bytes=DEFAULT_MAX_UPLOAD_BYTES,
+        log_requests=False,
+        log=print):
+    service = JobService(workers=workers, queue_size=queue_size, cache_dir=cache_dir, upload_dir=upload_dir)
+    server = create_server(service, host, port, max_upload_bytes, log_requests)
+
+    log(f"Serving on http://{host}:{server.server_port} with {workers} workers and room for {queue_size} queued clips")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
@@ -0,0 +1,254 @@
+"""
+This class is responsible for storing analysed sessions in a local SQLite
+database: session metadata, per-rep metrics and a compressed copy of the
+trajectory, indexed by athlete, lift and date so an athlete's velocity
+history can be queried across many sessions.
+"""
+
+import datetime
+import json
+import os
+import sqlite3
+import zlib
+
+import numpy as np
+
+from barbell_analyser import BarbellAnalyser, ANALYSER_SETTINGS, REP_COLUMNS
+
+
+DEFAULT_DB_PATH = os.path.join(os.path.expanduser("~"), ".barbell_tracker", "sessions.db")
+
+# One record per tracked sample; float32 keeps sub-millimetre and
+# sub-millisecond precision at half the size
+TRAJECTORY_DTYPE = np.dtype([
+    ("frame", "<i4"),
+    ("time", "<f4"),
+    ("x", "<f4"),
+    ("y", "<f4"),
+    ("score", "<f4"),
+])
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    athlete TEXT NOT NULL,
+    lift TEXT NOT NULL,
+    recorded_at TEXT NOT NULL,
+    video_path TEXT,
+    load_kg REAL,
+    num_frames INTEGER NOT NULL,
+    rep_count INTEGER NOT NULL,
+    concentric_velocity_sum REAL NOT NULL,
+    peak_velocity REAL,
+    settings TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS sessions_athlete_lift_date ON sessions (athlete, lift, recorded_at);
+CREATE INDEX IF NOT EXISTS sessions_lift_date ON sessions (lift, recorded_at);
+CREATE INDEX IF NOT EXISTS sessions_date ON sessions (recorded_at);
+
+CREATE TABLE IF NOT EXISTS reps (
+    session_id INTEGER NOT NULL REFERENCES sessions (id) ON DELETE CASCADE,
+    {rep_columns},
+    PRIMARY KEY (session_id, rep)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS trajectories (
+    session_id INTEGER PRIMARY KEY REFERENCES sessions (id) ON DELETE CASCADE,
+    data BLOB NOT NULL
+);
+""".format(rep_columns=",\n    ".join(
+    f"{name} INTEGER NOT NULL" if name == "rep" else f"{name} REAL" for name in REP_COLUMNS
+))
+
+# Columns returned for each session, leaving out the bulky settings
+SESSION_COLUMNS = (
+    "id",
+    "athlete",
+    "lift",
+    "recorded_at",
+    "video_path",
+    "load_kg",
+    "num_frames",
+    "rep_count",
+    "peak_velocity",
+)
+
+
+class SessionStore:
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        self.db_path = db_path
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+
+        self.connection = sqlite3.connect(db_path)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        if db_path != ":memory:":
+            self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def save_session(self, analyser, athlete, lift, recorded_at=None, video_path=None, load_kg=None):
+        if recorded_at is None:
+            recorded_at = datetime.datetime.now()
+        if isinstance(recorded_at, datetime.datetime):
+            recorded_at = recorded_at.isoformat(sep=" ", timespec="seconds")
+
+        reps = analyser.get_reps()
+        settings = {name: getattr(analyser, name) for name in ANALYSER_SETTINGS}
+
+        # The per-session velocity sum lets weekly queries skip the reps table
+        with self.connection:
+            cursor = self.connection.execute(
+                "INSERT INTO sessions (athlete, lift, recorded_at, video_path, load_kg, num_frames, "
+                "rep_count, concentric_velocity_sum, peak_velocity, settings) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    athlete,
+                    lift,
+                    recorded_at,
+                    video_path,
+                    load_kg,
+                    int(analyser.num_frames),
+                    len(reps["rep"]),
+                    float(np.sum(reps["mean_velocity"])),
+                    float(np.max(reps["peak_velocity"])) if len(reps["rep"]) else None,
+                    json.dumps(settings),
+                )
+            )
+            session_id = cursor.lastrowid
+
+            rows = zip(*(reps[name].tolist() for name in REP_COLUMNS))
+            self.connection.executemany(
+                f"INSERT INTO reps (session_id, {', '.join(REP_COLUMNS)}) "
+                f"VALUES (?, {', '.join('?' for _ in REP_COLUMNS)})",
+                (
+                    (session_id,) + tuple(None if value != value else value for value in row)
+                    for row in rows
+                )
+            )
+
+            self.connection.execute(
+                "INSERT INTO trajectories (session_id, data) VALUES (?, ?)",
+                (session_id, encode_trajectory(analyser))
+            )
+
+        return session_id
+
+    def delete_session(self, session_id):
+        with self.connection:
+            self.connection.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def get_session(self, session_id):
+        row = self.connection.execute(
+            f"SELECT {', '.join(SESSION_COLUMNS)}, settings FROM sessions WHERE id = ?", (session_id,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        session = dict(zip(SESSION_COLUMNS, row))
+        session["settings"] = json.loads(row[-1])
+        return session
+
+    def find_sessions(self, athlete=None, lift=None, start=None, end=None):
+        where, parameters = get_filters(athlete, lift, start, end)
+        rows = self.connection.execute(
+            f"SELECT {', '.join(SESSION_COLUMNS)} FROM sessions {where} ORDER BY recorded_at", parameters
+        )
+        return [dict(zip(SESSION_COLUMNS, row)) for row in rows]
+
+    def get_reps(self, session_id):
+        rows = self.connection.execute(
+            f"SELECT {', '.join(REP_COLUMNS)} FROM reps WHERE session_id = ? ORDER BY rep", (session_id,)
+        ).fetchall()
+
+        values = np.array(rows, dtype=np.float64).reshape(-1, len(REP_COLUMNS))
+        reps = {name: values[:, i] for i, name in enumerate(REP_COLUMNS)}
+        reps["rep"] = reps["rep"].astype(np.int64)
+        return reps
+
+    def get_trajectory(self, session_id):
+        row = self.connection.execute(
+            "SELECT data FROM trajectories WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        return decode_trajectory(row[0])
+
+    def load_analyser(self, session_id):
+        session = self.get_session(session_id)
+        trajectory = self.get_trajectory(session_id)
+        if session is None or trajectory is None:
+            raise Exception(f"No stored session with id {session_id}.")
+
+        return BarbellAnalyser(
+            np.column_stack([trajectory["x"], trajectory["y"]]),
+            trajectory["time"],
+            session["num_frames"],
+            frame_indices=trajectory["frame"],
+            scores=trajectory["score"],
+            **session["settings"]
+        )
+
+    def get_weekly_velocity(self, athlete, lift, start=None, end=None):
+        # Weeks start on Monday; %w counts from Sunday as 0
+        where, parameters = get_filters(athlete, lift, start, end)
+        rows = self.connection.execute(
+            "SELECT date(recorded_at, '-' || ((strftime('%w', recorded_at) + 6) % 7) || ' days') AS week, "
+            "SUM(concentric_velocity_sum) / SUM(rep_count), SUM(rep_count), COUNT(*) "
+            f"FROM sessions {where} AND rep_count > 0 GROUP BY week ORDER BY week",
+            parameters
+        )
+
+        return [
+            {
+                "week": week,
+                "mean_concentric_velocity": mean_velocity,
+                "rep_count": rep_count,
+                "session_count": session_count,
+            }
+            for week, mean_velocity, rep_count, session_count in rows
+        ]
+
+
+def get_filters(athlete=None, lift=None, start=None, end=None):
+    conditions = []
+    parameters = []
+    for condition, value in (
+            ("athlete = ?", athlete),
+            ("lift = ?", lift),
+            ("recorded_at >= ?", start),
+            ("recorded_at < ?", end)):
+        if value is not None:
+            if isinstance(value, datetime.datetime):
+                value = value.isoformat(sep=" ")
+            elif isinstance(value, datetime.date):
+                value = value.isoformat()
+            conditions.append(condition)
+            parameters.append(value)
+
+    return "WHERE " + (" AND ".join(conditions) if conditions else "1"), parameters
+
+
+def encode_trajectory(analyser):
+    trajectory = np.empty(len(analyser.timestamps), dtype=TRAJECTORY_DTYPE)
+    trajectory["frame"] = analyser.frame_indices
+    trajectory["time"] = analyser.timestamps
+    trajectory["x"] = analyser.positions[:, 0] / analyser.pixels_per_meter
+    trajectory["y"] = analyser.positions[:, 1] / analyser.pixels_per_meter
+    trajectory["score"] = analyser.scores
+
+    return zlib.compress(trajectory.tobytes())
+
+
+def decode_trajectory(data):
+    return np.frombuffer(zlib.decompress(data), dtype=TRAJECTORY_DTYPE)
@@ -0,0 +1,121 @@
+"""
+This class is responsible for analysing barbell positions as the tracker
+produces them, giving live vertical velocity and per-rep peak velocity with a
+fixed, bounded lag instead of waiting for the whole video to be tracked.
+"""
+
+from collections import deque
+
+import numpy as np
+
+
+class StreamingAnalyser:
+    def __init__(
+            self,
+            window_length=15,
+            polynomial_order=2,
+            rep_velocity_threshold=0.05,
+            min_rep_duration=0.2,
+            max_sample_gap=0.5,
+            on_velocity=None,
+            on_rep=None):
+        self.window_length = window_length
+        self.polynomial_order = polynomial_order
+        self.rep_velocity_threshold = rep_velocity_threshold
+        self.min_rep_duration = min_rep_duration
+        self.max_sample_gap = max_sample_gap
+        self.on_velocity = on_velocity
+        self.on_rep = on_rep
+        self.reset()
+
+    def reset(self):
+        self.samples = deque(maxlen=self.window_length)
+        self.velocity = None
+        self.velocity_time = None
+        self.peak_velocity = None
+        self.reps = []
+        self.rep_start_time = None
+        self.rep_end_time = None
+        self.rep_velocity_sum = 0
+        self.rep_velocity_count = 0
+        self.rep_peak_velocity = 0
+        self.rep_peak_time = None
+
+    def add_position(self, timestamp, position):
+        # Lost tracking leaves a hole that a local fit should not bridge
+        if self.samples and timestamp - self.samples[-1][0] > self.max_sample_gap:
+            self.samples.clear()
+            self.end_rep()
+
+        # Flip y so that upward movement is positive, as in BarbellAnalyser
+        self.samples.append((timestamp, -position[1]))
+        if len(self.samples) < self.window_length:
+            return None
+
+        # Fixed-lag smoothing: fit a local polynomial over the window and
+        # take its derivative at the centre sample
+        times, heights = np.array(self.samples).T
+        centre_time = float(times[len(times) // 2])
+        coefficients = np.polyfit(times - centre_time, heights, self.polynomial_order)
+
+        self.velocity = float(coefficients[-2])
+        self.velocity_time = centre_time
+        if self.peak_velocity is None or self.velocity > self.peak_velocity:
+            self.peak_velocity = self.velocity
+
+        self.update_rep(centre_time, self.velocity)
+
+        if self.on_velocity is not None:
+            self.on_velocity(centre_time, self.velocity)
+
+        return self.velocity
+
+    def update_rep(self, timestamp, velocity):
+        # A rep's concentric phase lasts while the bar moves upward faster
+        # than the threshold
+        if velocity <= self.rep_velocity_threshold:
+            self.end_rep(timestamp)
+            return
+
+        if self.rep_start_time is None:
+            self.rep_start_time = timestamp
+            self.rep_velocity_sum = 0
+            self.rep_velocity_count = 0
+            self.rep_peak_velocity = velocity
+            self.rep_peak_time = timestamp
+
+        self.rep_velocity_sum += velocity
+        self.rep_velocity_count += 1
+        if velocity > self.rep_peak_velocity:
+            self.rep_peak_velocity = velocity
+            self.rep_peak_time = timestamp
+
+        self.rep_end_time = timestamp
+
+    def end_rep(self, timestamp=None):
+        if self.rep_start_time is None:
+            return
+
+        end_time = timestamp if timestamp is not None else self.rep_end_time
+        start_time = self.rep_start_time
+        self.rep_start_time = None
+
+        if end_time - start_time < self.min_rep_duration:
+            return
+
+        rep = {
+            "rep": len(self.reps) + 1,
+            "start_time": start_time,
+            "end_time": end_time,
+            "mean_velocity": self.rep_velocity_sum / self.rep_velocity_count,
+            "peak_velocity": self.rep_peak_velocity,
+            "time_to_peak": self.rep_peak_time - start_time,
+        }
+        self.reps.append(rep)
+
+        if self.on_rep is not None:
+            self.on_rep(rep)
+
+    def finish(self):
+        self.end_rep()
+        return self.reps
@@ -3,7 +3,64 @@ This class is responsible for tracking the barbell using OpenCV and generating
 position data.
 """
 
+import abc
+import concurrent.futures
+import queue
+import threading
+import time
+
 import cv2
+import numpy as np
+
+from barbell_trajectory import Trajectory
+
+# Conversions from decoded BGR frames to each supported matching colour space
+COLOR_CONVERSIONS = {
+    "bgr": None,
+    "gray": cv2.COLOR_BGR2GRAY,
+}
+
+# Smallest template side length worth matching at a coarse pyramid level
+MIN_PYRAMID_TEMPLATE_SIZE = 8
+
+# Stages timed by TrackerStats, in pipeline order
+TRACKING_STAGES = ("decode", "skip", "wait", "match", "draw", "display")
+
+SCORE_HISTOGRAM_BINS = 20
+
+# Backends that follow the plate between template matches
+OPENCV_TRACKERS = ("kcf", "csrt", "mosse", "mil")
+BACKEND_NAMES = (
+    ("template", "optical_flow")
+    + OPENCV_TRACKERS
+    + tuple("hybrid_" + name for name in ("optical_flow",) + OPENCV_TRACKERS)
+)
+
+# Fewest optical flow features worth estimating a shift from
+MIN_FLOW_FEATURES = 5
+
+# Chunks handed to each worker process when tracking a video in parallel
+CHUNKS_PER_WORKER = 4
+
+# Width frames are shrunk to before measuring motion for find_active_range
+ACTIVITY_SCAN_WIDTH = 64
+
+# Width frames are shrunk to before looking for the plate
+DETECTION_WIDTH = 320
+
+# Range of scene heights, in meters, a lifting video is expected to cover;
+# with the plate's real size this bounds its size in pixels
+MIN_SCENE_HEIGHT_M = 1.0
+MAX_SCENE_HEIGHT_M = 6.0
+
+# Points sampled around a candidate circle when checking it against edges
+CIRCLE_SAMPLES = 90
+
+# Motion energy, in grey levels, and its ratio to the quiet parts of the
+# video, that a stretch of video must exceed to count as activity
+MIN_ACTIVITY_ENERGY = 0.1
+MIN_ACTIVITY_RATIO = 1.5
+
 
 class BarbellTracker:
     def __init__(
@@ -12,121 +69,822 @@ class BarbellTracker:
             sample_interval=1,
             show_bar_path=True,
             barbell_height_m=0.45,
-            match_threshold=0.3):
+            match_threshold=0.3,
+            predict_motion=True,
+            search_margin=1.0,
+            search_expansions=2,
+            pyramid_levels=0,
+            color_space="bgr",
+            seek_threshold=120,
+            queue_size=8,
+            workers=1,
+            chunk_overlap=30,
+            preview_fps=30,
+            cache=None,
+            on_position=None,
+            on_preview=None,
+            profile_hook=None,
+            backend="template",
+            reanchor_interval=10,
+            auto_detect=True,
+            detection_threshold=0.6,
+            manual_fallback=True):
         self.show_preview = show_preview
         self.sample_interval = sample_interval
         self.show_bar_path = show_bar_path
         self.barbell_height_m = barbell_height_m
         self.match_threshold = match_threshold
+        self.predict_motion = predict_motion
+        self.search_margin = search_margin
+        self.search_expansions = search_expansions
+        self.pyramid_levels = pyramid_levels
+        self.color_space = color_space
+        self.seek_threshold = seek_threshold
+        self.queue_size = queue_size
+        self.workers = workers
+        self.chunk_overlap = chunk_overlap
+        self.preview_fps = preview_fps
+        self.cache = cache
+        self.on_position = on_position
+        self.on_preview = on_preview
+        self.profile_hook = profile_hook
+        self.backend_name = backend
+        self.reanchor_interval = reanchor_interval
+        self.auto_detect = auto_detect
+        self.detection_threshold = detection_threshold
+        self.manual_fallback = manual_fallback
+        if backend not in BACKEND_NAMES:
+            raise Exception(f"Unknown tracking backend: {backend}")
+        if color_space not in COLOR_CONVERSIONS:
+            raise Exception(f"Unknown colour space: {color_space}")
         self.reset()
 
     def reset(self):
         self.template = None
+        self.template_pyramid = []
+        self.backend = None
         self.template_region = None
+        self.detection = None
+        self.template_frame = 0
         self.pixels_per_meter = None
-        self.positions = []
-        self.timestamps = []
+        self.trajectory = Trajectory()
         self.fps = 0
+        self.frame_rate = 0.0
         self.num_frames = 0
+        self.start_frame = 0
+        self.end_frame = None
         self.current_frame = 0
+        self.last_match = None
+        self.cancelled = False
+        self.stop_event = threading.Event()
+        self.live_stats = None
+        self.stats = TrackerStats()
 
-    def track(self, video_path):
+    def track(
+            self,
+            video_path,
+            template_region=None,
+            template_image=None,
+            start_frame=None,
+            end_frame=None,
+            start_time=None,
+            end_time=None):
         self.reset()
 
-        cap = cv2.VideoCapture(video_path)
-        if not cap.isOpened():
-            raise Exception("Could not open video file.")
+        cap = self.open_capture(video_path)
+        self.start_frame, self.end_frame = self.get_frame_range(
+            start_frame, end_frame, start_time, end_time, cap.get(cv2.CAP_PROP_FPS))
+
+        ret, frame = cap.read()
+        if not ret:
+            raise Exception("Could not read first frame.")
+
+        # Regions and template images passed in refer to the first frame of
+        # the video, as in sidecars, manifests and find_active_range; the
+        # plate is only detected or selected on the first frame of the range
+        self.template_frame = 0
+        if self.start_frame > 0 and template_region is None and template_image is None:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, self.start_frame)
+            ret, frame = cap.read()
+            if not ret:
+                raise Exception("Could not read the first frame of the tracking range.")
+            self.template_frame = self.start_frame
+
+        # Seeking lands on the keyframe before the start and decodes forward,
+        # so frames before the range are never tracked
+        cap.set(cv2.CAP_PROP_POS_FRAMES, self.start_frame)
+        self.current_frame = self.start_frame
+        self.trajectory = Trajectory(self.get_sample_count())
+
+        template_region = self.acquire_template(frame, template_region, template_image)
+
+        cache_key = None
+        if self.cache is not None:
+            settings = dict(
+                self.get_settings(),
+                start_frame=self.start_frame,
+                end_frame=self.end_frame,
+                template_frame=self.template_frame
+            )
+            cache_key = self.cache.make_key(video_path, template_region, settings)
+            if self.load_cached(cache_key):
+                cap.release()
+                return self.trajectory
+
+        if self.workers > 1:
+            cap.release()
+            self.track_chunks(video_path, self.start_frame, self.end_frame)
+        else:
+            self.track_capture(cap, self.start_frame, self.end_frame)
+
+        # Runs stopped part way through are not worth keeping
+        if cache_key is not None and not self.cancelled:
+            self.cache.store(cache_key, self.trajectory, self.fps, self.num_frames, self.pixels_per_meter)
+
+        return self.trajectory
+
+    def track_live(self, source, template_region=None, template_image=None, latency_budget=0.1, duration=None, loop=False):
+        self.reset()
 
+        cap = open_live_capture(source, loop)
         self.fps = int(cap.get(cv2.CAP_PROP_FPS))
-        self.num_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
 
         ret, frame = cap.read()
         if not ret:
-            raise Exception("Could not read first frame.")
+            cap.release()
+            raise Exception("Could not read first frame from live source.")
+
+        self.acquire_template(frame, template_region, template_image)
+
+        # The capture thread only ever keeps the newest frame, so matching
+        # never works through a backlog of stale frames
+        latest_frame = LatestFrame()
+        preview_queue = queue.Queue(maxsize=1)
+        errors = []
+        self.live_stats = {
+            "frames_captured": 0,
+            "frames_dropped": 0,
+            "frames_matched": 0,
+            "latency_last": 0.0,
+            "latency_mean": 0.0,
+            "latency_max": 0.0,
+        }
+
+        capturer = threading.Thread(
+            target=self.capture_frames,
+            args=(cap, latest_frame, errors),
+            daemon=True
+        )
+        self.stats.start()
+        capturer.start()
+
+        try:
+            if self.show_preview:
+                self.run_with_preview(
+                    self.match_live_frames,
+                    (latest_frame, capturer, preview_queue, latency_budget, duration),
+                    preview_queue,
+                    errors
+                )
+            else:
+                self.match_live_frames(latest_frame, capturer, None, latency_budget, duration)
+        finally:
+            self.stop_event.set()
+            capturer.join()
+            self.stats.finish()
+
+        self.live_stats["frames_captured"] = latest_frame.frames_put
+        self.live_stats["frames_dropped"] += latest_frame.frames_overwritten
+
+        if errors:
+            raise errors[0]
+
+        return self.trajectory
+
+    def match_live_frames(self, latest_frame, capturer, preview_queue, latency_budget, duration):
+        start_time = time.perf_counter()
+        while not self.stop_event.is_set():
+            if duration is not None and time.perf_counter() - start_time >= duration:
+                break
+
+            item = latest_frame.get(timeout=0.5)
+            if item is None:
+                if not capturer.is_alive():
+                    break
+                continue
+
+            frame_index, frame, capture_time = item
+
+            # Frames that waited longer than the budget are already stale
+            if time.perf_counter() - capture_time > latency_budget:
+                self.live_stats["frames_dropped"] += 1
+                continue
 
-        cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            self.current_frame = frame_index + 1
+            position = self.track_frame(frame)
+            self.record_match(frame_index, position, capture_time - start_time)
+
+            latency = time.perf_counter() - capture_time
+            self.update_live_stats(latency)
+
+            if preview_queue is not None:
+                max_val, max_loc = self.last_match
+                try:
+                    preview_queue.put_nowait((frame, self.current_frame, max_val, max_loc, position))
+                except queue.Full:
+                    pass
+
+    def capture_frames(self, cap, latest_frame, errors):
+        frame_index = 0
+        try:
+            while not self.stop_event.is_set():
+                start_time = time.perf_counter()
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                self.add_stage_time("decode", time.perf_counter() - start_time)
+                self.stats.frames_decoded += 1
+
+                latest_frame.put(frame_index, frame, time.perf_counter())
+                frame_index += 1
+        except Exception as e:
+            errors.append(e)
+            self.stop_event.set()
+        finally:
+            cap.release()
+
+    def update_live_stats(self, latency):
+        stats = self.live_stats
+        stats["frames_matched"] += 1
+        stats["latency_last"] = latency
+        stats["latency_mean"] += (latency - stats["latency_mean"]) / stats["frames_matched"]
+        stats["latency_max"] = max(stats["latency_max"], latency)
+
+    def get_frame_range(self, start_frame=None, end_frame=None, start_time=None, end_time=None, fps=0):
+        # Times are converted to the nearest frame; frames win when both
+        # are given
+        if start_frame is None and start_time is not None:
+            start_frame = int(round(start_time * fps)) if fps > 0 else 0
+        if end_frame is None and end_time is not None:
+            end_frame = int(round(end_time * fps)) if fps > 0 else None
+
+        start_frame = max(start_frame or 0, 0)
+        if self.num_frames > 0:
+            start_frame = min(start_frame, self.num_frames - 1)
+            if end_frame is not None:
+                end_frame = min(end_frame, self.num_frames)
+
+        if end_frame is not None and end_frame <= start_frame:
+            raise Exception("The end of the tracking range must come after its start.")
 
-        self.template_region = self.get_template_selection(frame)
-        if self.template_region is None:
+        return start_frame, end_frame
+
+    def get_sample_count(self):
+        # Frames the tracker will match, used to size the trajectory up front
+        end_frame = self.end_frame if self.end_frame is not None else self.num_frames
+        return -(-max(end_frame - self.start_frame, 0) // self.sample_interval)
+
+    def get_tracked_frame_count(self):
+        end_frame = self.end_frame if self.end_frame is not None else self.num_frames
+        return max(end_frame - self.start_frame, 0)
+
+    def stop(self):
+        self.cancelled = True
+        self.stop_event.set()
+
+    def acquire_template(self, frame, template_region=None, template_image=None):
+        detected = False
+
+        # A saved region or template image skips the interactive selection
+        if template_image is not None:
+            template_region = self.locate_template(frame, template_image)
+            if template_region is None:
+                raise Exception("Could not find template image in first frame.")
+        elif template_region is None and self.auto_detect:
+            template_region = self.detect_template(frame)
+            detected = template_region is not None
+
+        if template_region is None and template_image is None:
+            if not self.manual_fallback:
+                confidence = self.detection["confidence"] if self.detection else 0.0
+                raise Exception(f"Could not detect the barbell plate (confidence {confidence:.2f}).")
+            template_region = self.get_template_selection(frame)
+
+        if template_region is None:
             raise Exception("No selection made for barbell plate.")
 
-        x, y, w, h = self.template_region
+        x, y, w, h = template_region
+        self.set_template(frame[y:y+h, x:x+w].copy(), template_region)
+
+        # The fitted radius gives the scale even when the plate is cut off by
+        # the frame edge and its region is shorter than the plate
+        if detected:
+            self.pixels_per_meter = self.detection["pixels_per_meter"]
+
+        return template_region
+
+    def detect_template(self, frame):
+        self.detection = detect_plate(frame, self.barbell_height_m)
+        if self.detection is None or self.detection["confidence"] < self.detection_threshold:
+            return None
+
+        return self.detection["region"]
+
+    def load_cached(self, cache_key):
+        cached = self.cache.load(cache_key)
+        if cached is None:
+            return False
+
+        self.trajectory = cached["trajectory"]
+        self.fps = cached["fps"]
+        self.num_frames = cached["num_frames"]
+        self.pixels_per_meter = cached["pixels_per_meter"]
+        self.current_frame = self.end_frame if self.end_frame is not None else self.num_frames
+
+        return True
+
+    def open_capture(self, video_path):
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise Exception("Could not open video file.")
+
+        self.frame_rate = cap.get(cv2.CAP_PROP_FPS)
+        self.fps = int(self.frame_rate)
+        self.num_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+        return cap
+
+    def locate_template(self, frame, template_image):
+        result = cv2.matchTemplate(frame, template_image, cv2.TM_CCOEFF_NORMED)
+        min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
+
+        if max_val < self.match_threshold:
+            return None
+
+        h, w = template_image.shape[:2]
+        return (max_loc[0], max_loc[1], w, h)
+
+    def set_template(self, template, template_region):
+        x, y, w, h = template_region
         if w == 0 or h == 0:
             raise Exception("Invalid template region.")
 
-        self.template = frame[y:y+h, x:x+w].copy()
+        self.template = template
+        self.template_region = template_region
+        self.prepare_template()
+        self.backend = create_backend(self.backend_name, self)
 
         self.pixels_per_meter = h / self.barbell_height_m
 
-        if self.show_preview:
-            frame_width = frame.shape[1]
-            frame_height = frame.shape[0]
-            window_width = int(800 * frame_width / frame_height)
-            window_height = 800
-            cv2.namedWindow("Barbell Tracking", cv2.WINDOW_NORMAL)
-            cv2.resizeWindow("Barbell Tracking", window_width, window_height)
+    def get_settings(self):
+        return {
+            "show_preview": self.show_preview,
+            "sample_interval": self.sample_interval,
+            "show_bar_path": self.show_bar_path,
+            "barbell_height_m": self.barbell_height_m,
+            "match_threshold": self.match_threshold,
+            "predict_motion": self.predict_motion,
+            "search_margin": self.search_margin,
+            "search_expansions": self.search_expansions,
+            "pyramid_levels": self.pyramid_levels,
+            "color_space": self.color_space,
+            "seek_threshold": self.seek_threshold,
+            "queue_size": self.queue_size,
+            "workers": self.workers,
+            "chunk_overlap": self.chunk_overlap,
+            "preview_fps": self.preview_fps,
+            "backend": self.backend_name,
+            "reanchor_interval": self.reanchor_interval,
+            "auto_detect": self.auto_detect,
+            "detection_threshold": self.detection_threshold,
+            "manual_fallback": self.manual_fallback,
+        }
 
-        # Tracking loop using template matching
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
+    def track_capture(self, cap, start_frame=0, end_frame=None):
+        # Decode, match and preview run as separate stages connected by
+        # bounded queues, so memory stays fixed however long the video is
+        stop_event = self.stop_event
+        frame_queue = queue.Queue(maxsize=self.queue_size)
+        preview_queue = queue.Queue(maxsize=self.queue_size)
+        errors = []
 
-            if self.current_frame % self.sample_interval != 0:
-                self.current_frame += 1
-                continue
+        self.stats.start()
+        decoder = threading.Thread(
+            target=self.decode_frames,
+            args=(cap, start_frame, end_frame, frame_queue, stop_event, errors),
+            daemon=True
+        )
+        decoder.start()
+
+        try:
+            if self.show_preview:
+                self.run_with_preview(self.match_frames, (frame_queue, preview_queue, stop_event), preview_queue, errors)
+            else:
+                self.match_frames(frame_queue, None, stop_event)
+        finally:
+            stop_event.set()
+
+            # Drain the frame queue so a blocked decoder can reach its sentinel
+            while frame_queue.get() is not None:
+                pass
+            decoder.join()
+            self.stats.finish()
+
+        if errors:
+            raise errors[0]
+
+    def track_chunks(self, video_path, range_start=0, range_end=None):
+        # Chunk boundaries fall on sampled frames so the result matches a
+        # sequential run, and each chunk after the first starts early so the
+        # overlap can be reconciled against its neighbour
+        if range_end is None:
+            range_end = self.num_frames
+
+        chunk_count = self.workers * CHUNKS_PER_WORKER
+        step = self.sample_interval
+        chunk_size = max(-(-(range_end - range_start) // chunk_count), 1)
+        chunk_size = -(-chunk_size // step) * step
+        overlap = -(-self.chunk_overlap // step) * step
+
+        settings = self.get_settings()
+        settings["show_preview"] = False
+        settings["workers"] = 1
+
+        chunks = []
+        for start_frame in range(range_start, range_end, chunk_size):
+            end_frame = min(start_frame + chunk_size, range_end)
+            chunks.append((max(start_frame - overlap, range_start), end_frame))
+
+        chunk_columns = []
+        self.stats.start()
+        with concurrent.futures.ProcessPoolExecutor(max_workers=self.workers) as executor:
+            futures = [
+                executor.submit(
+                    track_chunk, video_path, settings, self.template,
+                    self.template_region, start_frame, end_frame)
+                for start_frame, end_frame in chunks
+            ]
+
+            for (start_frame, end_frame), future in zip(chunks, futures):
+                # Chunks not yet started are dropped when the run is stopped
+                if self.stop_event.is_set():
+                    for pending in futures:
+                        pending.cancel()
+                    break
+
+                columns, chunk_stats = future.result()
+                self.stats.merge(chunk_stats)
+                chunk_columns.append(columns)
+                self.current_frame = end_frame
+        self.stats.finish()
+
+        if not chunk_columns:
+            return
 
-            self.current_frame += 1
+        columns = {
+            name: np.concatenate([chunk[name] for chunk in chunk_columns])
+            for name in chunk_columns[0]
+        }
+
+        # Where chunks overlap keep the accepted match over a rejected one,
+        # then the more confident of the two
+        order = np.lexsort((columns["scores"], columns["valid"], columns["frame_indices"]))
+        frame_indices = columns["frame_indices"][order]
+        order = order[np.append(frame_indices[1:] != frame_indices[:-1], True)]
+        self.trajectory = Trajectory.from_columns(**{name: values[order] for name, values in columns.items()})
+
+        if self.on_position is not None:
+            samples = self.trajectory.get_valid()
+            for timestamp, position in zip(samples["timestamps"].tolist(), samples["positions"].tolist()):
+                self.on_position(timestamp, tuple(position))
+
+    def record_match(self, frame_index, position, timestamp):
+        # Rejected matches are kept as masked samples at the best match found
+        max_val, max_loc = self.last_match
+        if position is None:
+            self.record_position(frame_index, self.get_match_center(max_loc), timestamp, max_val, valid=False)
+        else:
+            self.record_position(frame_index, position, timestamp, max_val)
+
+    def record_position(self, frame_index, position, timestamp, score, valid=True):
+        self.trajectory.append(frame_index, timestamp, position, score, valid)
+
+        if valid and self.on_position is not None:
+            self.on_position(timestamp, position)
+
+    def decode_frames(self, cap, start_frame, end_frame, frame_queue, stop_event, errors):
+        frame_index = start_frame
+        try:
+            if start_frame > 0:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+
+            while not stop_event.is_set():
+                if end_frame is not None and frame_index >= end_frame:
+                    break
+
+                start_time = time.perf_counter()
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                timestamp = self.get_frame_time(cap, frame_index)
+                self.add_stage_time("decode", time.perf_counter() - start_time)
+                self.stats.frames_decoded += 1
+
+                frame_queue.put((frame_index, timestamp, frame))
+
+                start_time = time.perf_counter()
+                frame_index = self.skip_frames(cap, frame_index + 1, self.sample_interval - 1)
+                self.add_stage_time("skip", time.perf_counter() - start_time)
+        except Exception as e:
+            errors.append(e)
+            stop_event.set()
+        finally:
+            cap.release()
+            frame_queue.put(None)
+
+    def match_frames(self, frame_queue, preview_queue, stop_event):
+        while not stop_event.is_set():
+            start_time = time.perf_counter()
+            item = frame_queue.get()
+            self.add_stage_time("wait", time.perf_counter() - start_time)
+            if item is None:
+                # Put the sentinel back for the shutdown drain
+                frame_queue.put(None)
+                break
+
+            frame_index, timestamp, frame = item
+            self.current_frame = frame_index + 1
 
             position = self.track_frame(frame)
+            self.record_match(frame_index, position, timestamp)
+
+            if preview_queue is not None:
+                max_val, max_loc = self.last_match
+                preview_queue.put((frame, self.current_frame, max_val, max_loc, position))
+
+    def run_with_preview(self, target, args, preview_queue, errors):
+        # HighGUI windows only work from the main thread with the Cocoa and
+        # Qt backends, so matching moves to a worker thread and the preview
+        # stays on the calling thread, like the template selection
+        def run_matcher():
+            try:
+                target(*args)
+            except Exception as e:
+                errors.append(e)
+                self.stop_event.set()
+            finally:
+                preview_queue.put(None)
+
+        matcher = threading.Thread(target=run_matcher, daemon=True)
+        matcher.start()
+        try:
+            self.preview_frames(preview_queue, self.stop_event, errors)
+        finally:
+            # A preview interrupted before the sentinel must not leave the
+            # matcher blocked on a full queue
+            self.stop_event.set()
+            while matcher.is_alive():
+                try:
+                    preview_queue.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+
+    def preview_frames(self, preview_queue, stop_event, errors):
+        try:
+            path_overlay = None
+            last_shown = 0
+            while True:
+                item = preview_queue.get()
+                if item is None:
+                    break
 
-            if position is not None:
-                self.positions.append(position)
-                self.timestamps.append(cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0)
+                # Keep consuming after a stop so the matching stage never blocks
+                if stop_event.is_set():
+                    continue
 
-            if cv2.waitKey(1) & 0xFF == ord("q"):
+                frame, frame_number, max_val, max_loc, position = item
+                if path_overlay is None:
+                    path_overlay = PathOverlay(frame.shape)
+
+                    # Frames handed to on_preview are shown by the caller
+                    if self.on_preview is None:
+                        frame_height, frame_width = frame.shape[:2]
+                        window_width = int(800 * frame_width / frame_height)
+                        window_height = 800
+                        cv2.namedWindow("Barbell Tracking", cv2.WINDOW_NORMAL)
+                        cv2.resizeWindow("Barbell Tracking", window_width, window_height)
+
+                # Every position extends the path, even for frames not shown
+                if position is not None:
+                    path_overlay.add_point(position)
+
+                # Cap the refresh rate so preview cost doesn't follow tracking rate
+                now = time.perf_counter()
+                if self.preview_fps and now - last_shown < 1 / self.preview_fps:
+                    continue
+                last_shown = now
+
+                start_time = time.perf_counter()
+                self.draw_preview(frame, frame_number, max_val, max_loc, position,
+                                  path_overlay if self.show_bar_path else None)
+                self.add_stage_time("draw", time.perf_counter() - start_time)
+
+                start_time = time.perf_counter()
+                if self.on_preview is not None:
+                    self.on_preview(frame)
+                    self.add_stage_time("display", time.perf_counter() - start_time)
+                    continue
+
+                cv2.imshow("Barbell Tracking", frame)
+                key = cv2.waitKey(1) & 0xFF
+                self.add_stage_time("display", time.perf_counter() - start_time)
+
+                if key == ord("q"):
+                    self.cancelled = True
+                    stop_event.set()
+
+            if path_overlay is not None and self.on_preview is None:
+                cv2.destroyAllWindows()
+        except Exception as e:
+            errors.append(e)
+            stop_event.set()
+            while preview_queue.get() is not None:
+                pass
+
+    def skip_frames(self, cap, frame_index, count):
+        if count <= 0:
+            return frame_index
+
+        # Seeking jumps to the nearest keyframe, which beats decoding every
+        # skipped frame once the interval spans a typical GOP
+        if self.seek_threshold and count >= self.seek_threshold:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index + count)
+            return frame_index + count
+
+        # Grabbing advances the stream without retrieving the decoded image
+        for _ in range(count):
+            if not cap.grab():
                 break
+            frame_index += 1
 
-        cap.release()
-        cv2.destroyAllWindows()
+        return frame_index
 
-        return self.positions, self.timestamps
+    def get_frame_time(self, cap, frame_index):
+        # Only sampled frames are asked for their presentation time, which
+        # stays right for variable frame rate clips. Backends that report no
+        # time fall back to the nominal rate.
+        position_msec = cap.get(cv2.CAP_PROP_POS_MSEC)
+        if position_msec > 0 or frame_index == 0:
+            return position_msec / 1000.0
+        return frame_index / self.frame_rate if self.frame_rate > 0 else 0.0
 
     def track_frame(self, frame):
         position = None
 
-        # Use template matching to find the barbell plate
-        result = cv2.matchTemplate(frame, self.template, cv2.TM_CCOEFF_NORMED)
-        min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
-        x, y, w, h = self.template_region
+        # Locate the barbell plate with the selected backend
+        start_time = time.perf_counter()
+        max_val, max_loc = self.backend.update(frame)
+        self.add_stage_time("match", time.perf_counter() - start_time)
+
+        self.last_match = (max_val, max_loc)
 
         if max_val >= self.match_threshold:
-            center_x = max_loc[0] + w // 2
-            center_y = max_loc[1] + h // 2
+            position = self.get_match_center(max_loc)
+
+        self.stats.add_score(max_val, position is not None)
 
-            position = (center_x, center_y)
+        return position
 
-        if self.show_preview:
-            # Draw box and center
-            cv2.rectangle(frame, max_loc, (max_loc[0] + w, max_loc[1] + h), (0, 255, 0), 5)
-            cv2.circle(frame, (center_x, center_y), 10, (0, 0, 255), -1)
+    def get_match_center(self, max_loc):
+        x, y, w, h = self.template_region
+        return (max_loc[0] + w // 2, max_loc[1] + h // 2)
 
-            # Draw bar path
-            if self.show_bar_path and len(self.positions) > 1:
-                for i in range(1, len(self.positions)):
-                    last_point = (int(self.positions[i-1][0]), int(self.positions[i-1][1]))
-                    this_point = (int(self.positions[i][0]), int(self.positions[i][1]))
-                    cv2.line(frame, last_point, this_point, (255, 0, 255), 2)
+    def add_stage_time(self, stage, seconds):
+        self.stats.add_time(stage, seconds)
+        if self.profile_hook is not None:
+            self.profile_hook(stage, seconds)
 
-            cv2.putText(frame, f"Frame: {self.current_frame}/{self.num_frames}", (10, 60),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+    def draw_preview(self, frame, frame_number, max_val, max_loc, position, path_overlay=None):
+        x, y, w, h = self.template_region
+        center_x = max_loc[0] + w // 2
+        center_y = max_loc[1] + h // 2
 
-            match_text = f"Match: {max_val:.2f}" if position else "No match found"
-            cv2.putText(frame, match_text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+        # Draw box and center
+        cv2.rectangle(frame, max_loc, (max_loc[0] + w, max_loc[1] + h), (0, 255, 0), 5)
+        cv2.circle(frame, (center_x, center_y), 10, (0, 0, 255), -1)
 
-            cv2.imshow("Barbell Tracking", frame)
+        # Draw bar path
+        if path_overlay is not None:
+            path_overlay.draw(frame)
 
-        return position
+        cv2.putText(frame, f"Frame: {frame_number}/{self.num_frames}", (10, 60),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+
+        match_text = f"Match: {max_val:.2f}" if position else "No match found"
+        cv2.putText(frame, match_text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+
+    def match_template(self, frame):
+        h, w = self.template.shape[:2]
+        frame_height, frame_width = frame.shape[:2]
+
+        prediction = self.predict_position() if self.predict_motion else None
+
+        # Search an adaptive window around the predicted position, widening it
+        # each time the match falls below the threshold
+        if prediction is not None:
+            predicted_x, predicted_y = prediction
+            last_x, last_y = self.trajectory.positions[self.trajectory.recent_valid[-1]]
+            margin = (self.search_margin * max(w, h)
+                      + abs(predicted_x - last_x) + abs(predicted_y - last_y))
+
+            for _ in range(self.search_expansions + 1):
+                x0 = max(int(predicted_x - w / 2 - margin), 0)
+                y0 = max(int(predicted_y - h / 2 - margin), 0)
+                x1 = min(int(predicted_x + w / 2 + margin), frame_width)
+                y1 = min(int(predicted_y + h / 2 + margin), frame_height)
+                margin *= 2
+
+                if x1 - x0 < w or y1 - y0 < h:
+                    continue
+
+                max_val, max_loc = self.match_area(frame[y0:y1, x0:x1])
+                max_loc = (max_loc[0] + x0, max_loc[1] + y0)
+
+                if max_val >= self.match_threshold:
+                    return max_val, max_loc
+
+                # The window already covers the whole frame
+                if x0 == 0 and y0 == 0 and x1 == frame_width and y1 == frame_height:
+                    return max_val, max_loc
+
+        # Fall back to searching the full frame
+        return self.match_area(frame)
+
+    def prepare_template(self):
+        template = self.convert_color(self.template)
+        self.template_pyramid = [template]
+
+        for _ in range(self.pyramid_levels):
+            template = cv2.pyrDown(template)
+            if min(template.shape[:2]) < MIN_PYRAMID_TEMPLATE_SIZE:
+                break
+            self.template_pyramid.append(template)
+
+    def convert_color(self, image):
+        conversion = COLOR_CONVERSIONS[self.color_space]
+        if conversion is None:
+            return image
+        return cv2.cvtColor(image, conversion)
+
+    def match_area(self, area):
+        area = self.convert_color(area)
+        template = self.template_pyramid[0]
+        h, w = template.shape[:2]
+
+        # Coarse match on the top pyramid level
+        levels = len(self.template_pyramid) - 1
+        coarse_area = area
+        for _ in range(levels):
+            coarse_area = cv2.pyrDown(coarse_area)
+
+        coarse_template = self.template_pyramid[levels]
+        if (levels == 0
+                or coarse_area.shape[0] < coarse_template.shape[0]
+                or coarse_area.shape[1] < coarse_template.shape[1]):
+            result = cv2.matchTemplate(area, template, cv2.TM_CCOEFF_NORMED)
+            min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
+            return max_val, max_loc
+
+        result = cv2.matchTemplate(coarse_area, coarse_template, cv2.TM_CCOEFF_NORMED)
+        min_val, max_val, min_loc, coarse_loc = cv2.minMaxLoc(result)
+
+        # Refine at full resolution in a small neighbourhood of the coarse peak
+        scale = 2 ** levels
+        x0 = max(coarse_loc[0] * scale - 2 * scale, 0)
+        y0 = max(coarse_loc[1] * scale - 2 * scale, 0)
+        x1 = min(coarse_loc[0] * scale + w + 2 * scale, area.shape[1])
+        y1 = min(coarse_loc[1] * scale + h + 2 * scale, area.shape[0])
+
+        result = cv2.matchTemplate(area[y0:y1, x0:x1], template, cv2.TM_CCOEFF_NORMED)
+        min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
+
+        return max_val, (max_loc[0] + x0, max_loc[1] + y0)
+
+    def predict_position(self):
+        recent = self.trajectory.recent_valid
+        if not recent:
+            return None
+
+        positions = self.trajectory.positions
+        if len(recent) < 2:
+            return tuple(positions[recent[-1]])
+
+        # Constant-velocity prediction from the two most recent matches
+        (x0, y0), (x1, y1) = positions[recent[0]], positions[recent[1]]
+        frame0, frame1 = self.trajectory.frame_indices[recent].tolist()
+        steps = (self.current_frame - 1 - frame1) / max(frame1 - frame0, 1)
+
+        return (x1 + (x1 - x0) * steps, y1 + (y1 - y0) * steps)
 
     def get_template_selection(self, frame):
         frame_width = frame.shape[1]
@@ -178,7 +936,7 @@ class BarbellTracker:
         cv2.imshow("Select Barbell Plate", frame)
 
         # Wait for user selection
-        while selection is None:
+        while selection is None and not self.stop_event.is_set():
             key = cv2.waitKey(1) & 0xFF
             if key == ord("q"):
                 cv2.destroyWindow("Select Barbell Plate")
@@ -187,3 +945,525 @@ class BarbellTracker:
         cv2.destroyWindow("Select Barbell Plate")
 
         return selection
+
+
+class TrackingBackend(abc.ABC):
+    def __init__(self, tracker, reanchor_interval=None):
+        self.tracker = tracker
+        self.reanchor_interval = reanchor_interval
+        self.anchored = False
+        self.frames_since_anchor = 0
+
+    def update(self, frame):
+        # Template matching (re)acquires the plate; the backend follows it
+        # from there until it loses confidence or is due a re-anchor
+        if (self.anchored and self.reanchor_interval
+                and self.frames_since_anchor >= self.reanchor_interval):
+            self.anchored = False
+
+        if not self.anchored:
+            max_val, max_loc = self.tracker.match_template(frame)
+            if max_val >= self.tracker.match_threshold:
+                self.anchor(frame, max_loc)
+                self.anchored = True
+                self.frames_since_anchor = 0
+            return max_val, max_loc
+
+        max_val, max_loc = self.follow(frame)
+        self.frames_since_anchor += 1
+        if max_val < self.tracker.match_threshold:
+            self.anchored = False
+
+        return max_val, max_loc
+
+    def anchor(self, frame, top_left):
+        pass
+
+    @abc.abstractmethod
+    def follow(self, frame):
+        pass
+
+    def verify(self, frame, top_left):
+        # Score the followed box against the template so every backend
+        # reports a comparable confidence
+        template = self.tracker.template_pyramid[0]
+        h, w = template.shape[:2]
+        x, y = top_left
+        if x < 0 or y < 0 or x + w > frame.shape[1] or y + h > frame.shape[0]:
+            return 0.0
+
+        patch = self.tracker.convert_color(frame[y:y+h, x:x+w])
+        return float(cv2.matchTemplate(patch, template, cv2.TM_CCOEFF_NORMED)[0, 0])
+
+
+class TemplateBackend(TrackingBackend):
+    # Every frame is a full template match, so following is matching again
+    def follow(self, frame):
+        return self.tracker.match_template(frame)
+
+
+class OpticalFlowBackend(TrackingBackend):
+    def anchor(self, frame, top_left):
+        self.previous_gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        self.box = np.array(top_left, dtype=np.float64)
+        self.points = self.detect_features(self.previous_gray)
+
+    def detect_features(self, gray):
+        x, y, w, h = self.tracker.template_region
+        bx, by = max(int(self.box[0]), 0), max(int(self.box[1]), 0)
+        plate = gray[by:by+h, bx:bx+w]
+        if plate.size == 0:
+            return np.empty((0, 1, 2), dtype=np.float32)
+
+        points = cv2.goodFeaturesToTrack(plate, maxCorners=50, qualityLevel=0.01, minDistance=3)
+        if points is None:
+            return np.empty((0, 1, 2), dtype=np.float32)
+
+        return points + np.array([bx, by], dtype=np.float32)
+
+    def follow(self, frame):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        top_left = (int(round(self.box[0])), int(round(self.box[1])))
+        if len(self.points) < MIN_FLOW_FEATURES:
+            return 0.0, top_left
+
+        points, status, error = cv2.calcOpticalFlowPyrLK(
+            self.previous_gray, gray, self.points, None, winSize=(21, 21), maxLevel=3)
+        good = status.ravel() == 1
+        if good.sum() < MIN_FLOW_FEATURES:
+            return 0.0, top_left
+
+        # The plate moves rigidly, so the median shift is robust to outliers
+        self.box += np.median(points[good] - self.points[good], axis=0).ravel()
+        self.points = points[good].reshape(-1, 1, 2)
+        self.previous_gray = gray
+
+        top_left = (int(round(self.box[0])), int(round(self.box[1])))
+        if len(self.points) < 2 * MIN_FLOW_FEATURES:
+            self.points = self.detect_features(gray)
+
+        return self.verify(frame, top_left), top_left
+
+
+class OpenCVTrackerBackend(TrackingBackend):
+    def __init__(self, tracker, kind, reanchor_interval=None):
+        super().__init__(tracker, reanchor_interval)
+        self.kind = kind
+        self.create_tracker = get_opencv_tracker_factory(kind)
+        if self.create_tracker is None:
+            raise Exception(f"OpenCV tracker '{kind}' is not available in this OpenCV build.")
+
+    def anchor(self, frame, top_left):
+        x, y, w, h = self.tracker.template_region
+        self.cv_tracker = self.create_tracker()
+        self.cv_tracker.init(frame, (int(top_left[0]), int(top_left[1]), w, h))
+        self.top_left = top_left
+
+    def follow(self, frame):
+        ok, box = self.cv_tracker.update(frame)
+        if not ok:
+            return 0.0, self.top_left
+
+        # Keep the template's size, centred on the tracker's box
+        x, y, w, h = self.tracker.template_region
+        self.top_left = (
+            int(round(box[0] + box[2] / 2 - w / 2)),
+            int(round(box[1] + box[3] / 2 - h / 2))
+        )
+
+        return self.verify(frame, self.top_left), self.top_left
+
+
+def get_opencv_tracker_factory(kind):
+    # Tracker constructors moved between the main, contrib and legacy
+    # namespaces across OpenCV releases
+    class_name = "Tracker" + kind.upper() if kind != "mil" else "TrackerMIL"
+    for namespace in (cv2, getattr(cv2, "legacy", None)):
+        if namespace is None:
+            continue
+        factory = getattr(namespace, class_name + "_create", None)
+        if factory is not None:
+            return factory
+        tracker_class = getattr(namespace, class_name, None)
+        if tracker_class is not None and hasattr(tracker_class, "create"):
+            return tracker_class.create
+
+    return None
+
+
+def get_available_backends():
+    return [
+        name for name in BACKEND_NAMES
+        if name.split("_")[-1] not in OPENCV_TRACKERS
+        or get_opencv_tracker_factory(name.split("_")[-1]) is not None
+    ]
+
+
+def create_backend(name, tracker):
+    reanchor_interval = None
+    if name.startswith("hybrid_"):
+        name = name[len("hybrid_"):]
+        reanchor_interval = tracker.reanchor_interval
+
+    if name == "template":
+        return TemplateBackend(tracker)
+    if name == "optical_flow":
+        return OpticalFlowBackend(tracker, reanchor_interval)
+    if name in OPENCV_TRACKERS:
+        return OpenCVTrackerBackend(tracker, name, reanchor_interval)
+
+    raise Exception(f"Unknown tracking backend: {name}")
+
+
+class TrackerStats:
+    def __init__(self):
+        # The clock runs from the first frame handed to the pipeline, so
+        # template selection, plate detection and cache lookups don't count
+        self.start_time = None
+        self.end_time = None
+        self.stage_times = dict.fromkeys(TRACKING_STAGES, 0.0)
+        self.stage_counts = dict.fromkeys(TRACKING_STAGES, 0)
+        self.frames_decoded = 0
+        self.frames_matched = 0
+        self.frames_rejected = 0
+        self.score_histogram = [0] * SCORE_HISTOGRAM_BINS
+        self.score_sum = 0.0
+        self.score_min = None
+        self.score_max = None
+
+    def add_time(self, stage, seconds):
+        # Each stage is only timed from its own thread, so no lock is needed
+        self.stage_times[stage] = self.stage_times.get(stage, 0.0) + seconds
+        self.stage_counts[stage] = self.stage_counts.get(stage, 0) + 1
+
+    def add_score(self, score, accepted):
+        if accepted:
+            self.frames_matched += 1
+        else:
+            self.frames_rejected += 1
+
+        # Normalised cross-correlation scores fall in [-1, 1]; the histogram
+        # covers [0, 1] with negative scores counted in the lowest bin
+        bin_index = min(max(int(score * SCORE_HISTOGRAM_BINS), 0), SCORE_HISTOGRAM_BINS - 1)
+        self.score_histogram[bin_index] += 1
+        self.score_sum += score
+        self.score_min = score if self.score_min is None else min(self.score_min, score)
+        self.score_max = score if self.score_max is None else max(self.score_max, score)
+
+    def merge(self, other):
+        for stage, seconds in other.stage_times.items():
+            self.stage_times[stage] = self.stage_times.get(stage, 0.0) + seconds
+            self.stage_counts[stage] = self.stage_counts.get(stage, 0) + other.stage_counts[stage]
+        self.frames_decoded += other.frames_decoded
+        self.frames_matched += other.frames_matched
+        self.frames_rejected += other.frames_rejected
+        self.score_histogram = [a + b for a, b in zip(self.score_histogram, other.score_histogram)]
+        self.score_sum += other.score_sum
+        if other.score_min is not None:
+            self.score_min = other.score_min if self.score_min is None else min(self.score_min, other.score_min)
+            self.score_max = other.score_max if self.score_max is None else max(self.score_max, other.score_max)
+
+    def start(self):
+        if self.start_time is None:
+            self.start_time = time.perf_counter()
+
+    def finish(self):
+        if self.start_time is not None:
+            self.end_time = time.perf_counter()
+
+    def get_frames_scored(self):
+        return self.frames_matched + self.frames_rejected
+
+    def get_fps(self):
+        if self.start_time is None:
+            return 0.0
+        elapsed = (self.end_time or time.perf_counter()) - self.start_time
+        return self.get_frames_scored() / elapsed if elapsed > 0 else 0.0
+
+    def get_stage_means(self):
+        return {
+            stage: self.stage_times[stage] / self.stage_counts[stage]
+            for stage in self.stage_times
+            if self.stage_counts[stage] > 0
+        }
+
+    def get_snapshot(self):
+        frames_scored = self.get_frames_scored()
+        return {
+            "fps": self.get_fps(),
+            "frames_decoded": self.frames_decoded,
+            "frames_matched": self.frames_matched,
+            "frames_rejected": self.frames_rejected,
+            "stage_times": dict(self.stage_times),
+            "stage_counts": dict(self.stage_counts),
+            "stage_means": self.get_stage_means(),
+            "score_mean": self.score_sum / frames_scored if frames_scored else None,
+            "score_min": self.score_min,
+            "score_max": self.score_max,
+            "score_histogram": list(self.score_histogram),
+        }
+
+    def get_summary_string(self):
+        stage_means = self.get_stage_means()
+        summary = f"{self.get_fps():.1f} fps"
+        if stage_means:
+            summary += " | " + ", ".join(
+                f"{stage} {seconds * 1000:.1f} ms" for stage, seconds in stage_means.items()
+            )
+        return summary
+
+
+class PathOverlay:
+    def __init__(self, frame_shape, color=(255, 0, 255), thickness=2):
+        self.color = color
+        self.thickness = thickness
+        self.layer = np.zeros(frame_shape, dtype=np.uint8)
+        self.mask = np.zeros(frame_shape[:2], dtype=np.uint8)
+        self.last_point = None
+        self.bounds = None
+
+    def add_point(self, point):
+        point = (int(point[0]), int(point[1]))
+
+        # Each segment is drawn once into the layer rather than every frame
+        if self.last_point is not None:
+            cv2.line(self.layer, self.last_point, point, self.color, self.thickness)
+            cv2.line(self.mask, self.last_point, point, 255, self.thickness)
+            self.extend_bounds(self.last_point)
+            self.extend_bounds(point)
+
+        self.last_point = point
+
+    def extend_bounds(self, point):
+        height, width = self.mask.shape
+        x0 = max(point[0] - self.thickness, 0)
+        y0 = max(point[1] - self.thickness, 0)
+        x1 = min(point[0] + self.thickness + 1, width)
+        y1 = min(point[1] + self.thickness + 1, height)
+
+        if self.bounds is not None:
+            x0 = min(x0, self.bounds[0])
+            y0 = min(y0, self.bounds[1])
+            x1 = max(x1, self.bounds[2])
+            y1 = max(y1, self.bounds[3])
+
+        self.bounds = (x0, y0, x1, y1)
+
+    def draw(self, frame):
+        if self.bounds is None:
+            return
+
+        # Only composite the area the path has covered so far
+        x0, y0, x1, y1 = self.bounds
+        cv2.copyTo(self.layer[y0:y1, x0:x1], self.mask[y0:y1, x0:x1], frame[y0:y1, x0:x1])
+
+
+class LatestFrame:
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.item = None
+        self.frames_put = 0
+        self.frames_overwritten = 0
+
+    def put(self, frame_index, frame, capture_time):
+        with self.condition:
+            if self.item is not None:
+                self.frames_overwritten += 1
+            self.item = (frame_index, frame, capture_time)
+            self.frames_put += 1
+            self.condition.notify()
+
+    def get(self, timeout=None):
+        with self.condition:
+            if self.item is None:
+                self.condition.wait(timeout)
+            item, self.item = self.item, None
+            return item
+
+
+class LoopingVideoCapture:
+    def __init__(self, video_path):
+        self.cap = cv2.VideoCapture(video_path)
+        fps = self.cap.get(cv2.CAP_PROP_FPS)
+        self.frame_period = 1 / fps if fps > 0 else 1 / 30
+        self.next_frame_time = None
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def get(self, prop):
+        return self.cap.get(prop)
+
+    def read(self):
+        # Play the file back at its native frame rate, like a camera would
+        now = time.perf_counter()
+        if self.next_frame_time is None:
+            self.next_frame_time = now
+        elif self.next_frame_time > now:
+            time.sleep(self.next_frame_time - now)
+        self.next_frame_time += self.frame_period
+
+        ret, frame = self.cap.read()
+        if not ret:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read()
+
+        return ret, frame
+
+    def release(self):
+        self.cap.release()
+
+
+def open_live_capture(source, loop=False):
+    # Camera indices may arrive as strings from the command line
+    if isinstance(source, str) and source.isdigit():
+        source = int(source)
+
+    if loop and not isinstance(source, int):
+        cap = LoopingVideoCapture(source)
+    else:
+        cap = cv2.VideoCapture(source)
+
+    if not cap.isOpened():
+        raise Exception(f"Could not open live source: {source}")
+
+    return cap
+
+
+def detect_plate(frame, barbell_height_m=0.45):
+    # Plates show up as strong circles; Hough circle detection runs on a
+    # small blurred grayscale copy, limited to radii a plate of the given
+    # size could plausibly have
+    frame_height, frame_width = frame.shape[:2]
+    scale = min(DETECTION_WIDTH / frame_width, 1.0)
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    if scale < 1.0:
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    gray = cv2.medianBlur(gray, 5)
+
+    height = gray.shape[0]
+    min_radius = max(int(barbell_height_m / MAX_SCENE_HEIGHT_M * height / 2), 4)
+    max_radius = max(int(barbell_height_m / MIN_SCENE_HEIGHT_M * height / 2), min_radius + 1)
+    max_radius = min(max_radius, height // 2)
+
+    edge_threshold = 100
+    circles = cv2.HoughCircles(
+        gray, cv2.HOUGH_GRADIENT, dp=1.2, minDist=min_radius,
+        param1=edge_threshold, param2=20, minRadius=min_radius, maxRadius=max_radius)
+    if circles is None:
+        return None
+
+    # Confidence is the share of the circle's outline backed by an edge;
+    # partial or imagined circles score low
+    edges = cv2.dilate(cv2.Canny(gray, edge_threshold // 2, edge_threshold), np.ones((3, 3), np.uint8))
+    angles = np.linspace(0, 2 * np.pi, CIRCLE_SAMPLES, endpoint=False)
+    candidates = []
+    for cx, cy, radius in circles[0]:
+        xs = np.round(cx + radius * np.cos(angles)).astype(int)
+        ys = np.round(cy + radius * np.sin(angles)).astype(int)
+        inside = (xs >= 0) & (xs < gray.shape[1]) & (ys >= 0) & (ys < gray.shape[0])
+        support = np.count_nonzero(edges[ys[inside], xs[inside]]) / CIRCLE_SAMPLES
+        candidates.append((support, radius, cx, cy))
+
+    # Plate rims, hubs and inner rings are all circles; among the well
+    # supported ones the largest is the plate's outer edge
+    best_support = max(candidate[0] for candidate in candidates)
+    support, radius, cx, cy = max(
+        (candidate for candidate in candidates if candidate[0] >= 0.8 * best_support),
+        key=lambda candidate: candidate[1]
+    )
+
+    cx, cy, radius = float(cx) / scale, float(cy) / scale, float(radius) / scale
+    x = int(round(max(cx - radius, 0)))
+    y = int(round(max(cy - radius, 0)))
+    w = int(round(min(cx + radius, frame_width))) - x
+    h = int(round(min(cy + radius, frame_height))) - y
+
+    return {
+        "region": (x, y, w, h),
+        "center": (cx, cy),
+        "radius": radius,
+        "confidence": float(support),
+        "pixels_per_meter": 2 * radius / barbell_height_m,
+    }
+
+
+def find_active_range(video_path, region=None, scan_fps=10, padding=1.0, threshold=0.25):
+    # Motion energy is the mean absolute difference between sampled frames,
+    # measured on tiny grayscale copies so the scan costs little more than
+    # decoding. With a plate region, given in first-frame coordinates as for
+    # track(), only the column the bar moves in counts.
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise Exception("Could not open video file.")
+
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    num_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    if fps <= 0:
+        cap.release()
+        return None
+    stride = max(int(round(fps / scan_fps)), 1)
+
+    frame_indices = []
+    energies = []
+    previous = None
+    columns = None
+    frame_index = 0
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+
+            if columns is None:
+                frame_height, frame_width = frame.shape[:2]
+                columns = (0, frame_width)
+                if region is not None:
+                    x, y, w, h = region
+                    columns = (max(x - w, 0), min(x + 2 * w, frame_width))
+                scan_height = max(int(frame_height * ACTIVITY_SCAN_WIDTH / (columns[1] - columns[0])), 1)
+
+            small = cv2.resize(frame[:, columns[0]:columns[1]], (ACTIVITY_SCAN_WIDTH, scan_height), interpolation=cv2.INTER_AREA)
+            gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY).astype(np.float32)
+            if previous is not None:
+                frame_indices.append(frame_index)
+                energies.append(float(np.mean(np.abs(gray - previous))))
+            previous = gray
+
+            # Frames between samples are grabbed but never converted
+            for _ in range(stride - 1):
+                if not cap.grab():
+                    break
+                frame_index += 1
+            frame_index += 1
+    finally:
+        cap.release()
+
+    if len(energies) < 2:
+        return None
+
+    # Averaging over about a second keeps a single jolt from counting
+    window = min(max(int(round(scan_fps)), 1), len(energies))
+    smoothed = np.convolve(energies, np.ones(window) / window, mode="same")
+    floor = np.percentile(smoothed, 10)
+    peak = smoothed.max()
+    if peak - floor < MIN_ACTIVITY_ENERGY or peak < floor * MIN_ACTIVITY_RATIO:
+        return None
+
+    active = np.flatnonzero(smoothed > floor + threshold * (peak - floor))
+    last_frame = num_frames if num_frames > 0 else frame_index
+    start_frame = max(frame_indices[active[0]] - stride - padding * fps, 0)
+    end_frame = min(frame_indices[active[-1]] + 1 + padding * fps, last_frame)
+
+    return start_frame / fps, end_frame / fps
+
+
+def track_chunk(video_path, settings, template, template_region, start_frame, end_frame):
+    tracker = BarbellTracker(**settings)
+    cap = tracker.open_capture(video_path)
+    tracker.set_template(template, template_region)
+    tracker.start_frame, tracker.end_frame = start_frame, end_frame
+    tracker.trajectory = Trajectory(tracker.get_sample_count())
+    tracker.track_capture(cap, start_frame, end_frame)
+
+    return tracker.trajectory.get_columns(), tracker.stats
@@ -0,0 +1,132 @@
+"""
+This class is responsible for holding the samples produced by the barbell
+tracker in preallocated NumPy columns: frame index, time, position, match
+score and whether the match was accepted. The tracker fills it in place and
+the analyser reads its columns without copying them. Rejected matches stay
+in the trajectory as masked samples rather than being dropped.
+"""
+
+import numpy as np
+
+
+# Column name, dtype and shape of each sample
+COLUMNS = (
+    ("frame_indices", np.int64, ()),
+    ("timestamps", np.float64, ()),
+    ("positions", np.float64, (2,)),
+    ("scores", np.float64, ()),
+    ("valid", np.bool_, ()),
+)
+
+# Smallest capacity a trajectory grows to when its size wasn't known up front
+MIN_CAPACITY = 256
+
+
+class Trajectory:
+    def __init__(self, capacity=0):
+        self.data = {
+            name: np.zeros((max(int(capacity), 0),) + shape, dtype=dtype)
+            for name, dtype, shape in COLUMNS
+        }
+        self.length = 0
+        self.valid_count = 0
+
+        # Indices of the two most recent valid samples, newest last
+        self.recent_valid = []
+
+    @classmethod
+    def from_columns(cls, frame_indices, timestamps, positions, scores, valid=None):
+        # Columns that already have the right dtype are used as they are
+        trajectory = cls()
+        columns = {
+            "frame_indices": frame_indices,
+            "timestamps": timestamps,
+            "positions": positions,
+            "scores": scores,
+            "valid": np.ones(len(timestamps), dtype=np.bool_) if valid is None else valid,
+        }
+        trajectory.data = {
+            name: np.ascontiguousarray(columns[name], dtype=dtype).reshape((-1,) + shape)
+            for name, dtype, shape in COLUMNS
+        }
+        trajectory.length = len(trajectory.data["timestamps"])
+        trajectory.valid_count = int(np.count_nonzero(trajectory.data["valid"]))
+        trajectory.recent_valid = np.flatnonzero(trajectory.data["valid"])[-2:].tolist()
+
+        return trajectory
+
+    def __len__(self):
+        return self.length
+
+    @property
+    def capacity(self):
+        return len(self.data["timestamps"])
+
+    @property
+    def frame_indices(self):
+        return self.get_column("frame_indices")
+
+    @property
+    def timestamps(self):
+        return self.get_column("timestamps")
+
+    @property
+    def positions(self):
+        return self.get_column("positions")
+
+    @property
+    def scores(self):
+        return self.get_column("scores")
+
+    @property
+    def valid(self):
+        return self.get_column("valid")
+
+    def get_column(self, name):
+        # The length is read before the data so a reader on another thread
+        # never sees a slot that hasn't been written yet
+        length = self.length
+        return self.data[name][:length]
+
+    def get_columns(self):
+        length = self.length
+        return {name: values[:length] for name, values in self.data.items()}
+
+    def get_valid(self):
+        # Views when nothing was rejected, otherwise compacted copies
+        columns = self.get_columns()
+        if self.valid_count == len(columns["valid"]):
+            return columns
+
+        valid = columns["valid"]
+        return {name: values[valid] for name, values in columns.items()}
+
+    def reserve(self, capacity):
+        if capacity <= self.capacity:
+            return
+
+        # The new columns replace the old ones in one step, for readers on
+        # other threads
+        length = self.length
+        data = {}
+        for name, values in self.data.items():
+            data[name] = np.zeros((capacity,) + values.shape[1:], dtype=values.dtype)
+            data[name][:length] = values[:length]
+        self.data = data
+
+    def append(self, frame_index, timestamp, position, score, valid=True):
+        index = self.length
+        if index == self.capacity:
+            self.reserve(max(2 * self.capacity, MIN_CAPACITY))
+
+        data = self.data
+        data["frame_indices"][index] = frame_index
+        data["timestamps"][index] = timestamp
+        data["positions"][index] = position
+        data["scores"][index] = score
+        data["valid"][index] = valid
+
+        if valid:
+            self.valid_count += 1
+            self.recent_valid = self.recent_valid[-1:] + [index]
+        self.length = index + 1
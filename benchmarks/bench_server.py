@@ -0,0 +1,139 @@
+"""
+Load-tests the local HTTP job service: starts it on a free localhost port,
+has several clients upload synthetic clips at once and reports throughput,
+submit-to-result latency and how often the queue turned uploads away. A
+second round uploads the same clips again to show the tracking cache at work:
+
+    python benchmarks/bench_server.py --clients 8 --clips 16 --workers 2
+"""
+
+import argparse
+import concurrent.futures
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from barbell_server import JobService, create_server
+from synthetic_video import load_or_generate_video
+
+
+def request_json(url, data=None, method=None):
+    request = urllib.request.Request(url, data=data, method=method)
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+
+def run_clip(base_url, video_data, template_region, poll_interval):
+    # Uploads one clip, retrying while the queue is full, then polls until
+    # it finishes
+    region = ",".join(str(value) for value in template_region)
+    rejected = 0
+    start_time = time.perf_counter()
+    while True:
+        status, body = request_json(f"{base_url}/jobs?region={region}", video_data)
+        if status != 503:
+            break
+        rejected += 1
+        time.sleep(poll_interval)
+
+    if status != 202:
+        raise Exception(f"Upload failed with {status}: {body}")
+
+    job_id = body["id"]
+    while body["state"] not in ("done", "failed", "cancelled"):
+        time.sleep(poll_interval)
+        status, body = request_json(f"{base_url}/jobs/{job_id}")
+
+    if body["state"] != "done":
+        raise Exception(f"Job {job_id} {body['state']}: {body['error']}")
+
+    status, result = request_json(f"{base_url}/jobs/{job_id}/result")
+    return time.perf_counter() - start_time, rejected, result["results"]["rep_count"]
+
+
+def run_round(base_url, video_data, template_region, clients, clips, poll_interval):
+    start_time = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=clients) as executor:
+        futures = [
+            executor.submit(run_clip, base_url, video_data, template_region, poll_interval)
+            for _ in range(clips)
+        ]
+        outcomes = [future.result() for future in futures]
+    elapsed = time.perf_counter() - start_time
+
+    latencies = np.array([latency for latency, _, _ in outcomes])
+    return {
+        "elapsed_s": elapsed,
+        "clips_per_minute": clips / elapsed * 60,
+        "latency_p50_s": float(np.percentile(latencies, 50)),
+        "latency_p95_s": float(np.percentile(latencies, 95)),
+        "latency_max_s": float(latencies.max()),
+        "rejected_uploads": sum(rejected for _, rejected, _ in outcomes),
+        "rep_counts": sorted({rep_count for _, _, rep_count in outcomes}),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the local HTTP job service")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--clips", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--queue-size", type=int, default=4)
+    parser.add_argument("--resolution", default="640x360")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--poll-interval", type=float, default=0.1)
+    parser.add_argument("--video-dir", default=os.path.join(tempfile.gettempdir(), "barbell_benchmark_videos"))
+    parser.add_argument("-o", "--output", default=None, help="Also write the results as JSON")
+    args = parser.parse_args()
+
+    width, height = (int(value) for value in args.resolution.lower().split("x"))
+    video_path, ground_truth = load_or_generate_video(args.video_dir, width, height, args.frames, noise=8)
+    with open(video_path, "rb") as f:
+        video_data = f.read()
+
+    service = JobService(workers=args.workers, queue_size=args.queue_size, cache_dir=tempfile.mkdtemp())
+    server = create_server(service, port=0)
+    server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+    server_thread.start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    results = {
+        "clients": args.clients,
+        "clips": args.clips,
+        "workers": args.workers,
+        "queue_size": args.queue_size,
+        "video": os.path.basename(video_path),
+        "rounds": {},
+    }
+    try:
+        for name in ("cold", "cached"):
+            results["rounds"][name] = run_round(
+                base_url, video_data, ground_truth["template_region"], args.clients, args.clips, args.poll_interval)
+            round_results = results["rounds"][name]
+            print(f"{name:<7} {round_results['clips_per_minute']:>8.1f} clips/min  "
+                  f"p50 {round_results['latency_p50_s']:>6.2f} s  p95 {round_results['latency_p95_s']:>6.2f} s  "
+                  f"503s {round_results['rejected_uploads']:>4}")
+    finally:
+        server.shutdown()
+        server.server_close()
+        service.shutdown()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Benchmarks how long the GUI and CLI entry points take to start, each in a
+fresh interpreter, so heavy imports creeping back onto the startup path show
+up as regressions:
+
+    python benchmarks/bench_startup.py -o before.json
+    python benchmarks/bench_startup.py -o after.json --compare before.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Each case is run as `python -c <code>` from the repository root
+CASES = {
+    "import_gui": "import barbell_gui",
+    "import_main": "import main",
+    "cli_help": (
+        "import sys, main\n"
+        "sys.argv = ['main.py', '--help']\n"
+        "try:\n"
+        "    main.main()\n"
+        "except SystemExit:\n"
+        "    pass"
+    ),
+    "gui_window": (
+        "import tkinter as tk\n"
+        "from barbell_gui import BarbellGUI\n"
+        "root = tk.Tk()\n"
+        "app = BarbellGUI(root)\n"
+        "root.update()\n"
+        "root.destroy()"
+    ),
+    "warm_up": (
+        "import importlib, barbell_gui\n"
+        "for name in barbell_gui.WARM_UP_MODULES:\n"
+        "    importlib.import_module(name)"
+    ),
+}
+
+# Cases that need a display; they are skipped when Tk can't open a window
+DISPLAY_CASES = ("gui_window",)
+
+# warm_up runs in the background, so it is reported but never a regression
+REPORT_ONLY_CASES = ("warm_up",)
+
+
+def run_case(code, repeats):
+    times = []
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        result = subprocess.run([sys.executable, "-c", code], cwd=REPO_DIR, capture_output=True, text=True)
+        elapsed = time.perf_counter() - start_time
+        if result.returncode != 0:
+            raise Exception(f"Startup case failed:\n{result.stderr}")
+        times.append(elapsed)
+
+    return min(times)
+
+
+def has_display():
+    result = subprocess.run([sys.executable, "-c", "import tkinter; tkinter.Tk().destroy()"], capture_output=True)
+    return result.returncode == 0
+
+
+def get_slowest_imports(code, count):
+    # -X importtime reports the cumulative import time of every module
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=REPO_DIR, capture_output=True, text=True)
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        imports.append((name, int(cumulative) / 1000))
+
+    imports.sort(key=lambda item: item[1], reverse=True)
+    return [{"module": name, "cumulative_ms": ms} for name, ms in imports[:count]]
+
+
+def compare_results(results, baseline, tolerance):
+    regressions = []
+
+    for name, case in results["cases"].items():
+        previous = baseline["cases"].get(name)
+        if previous is None or case is None:
+            continue
+
+        old, new = previous["startup_ms"], case["startup_ms"]
+        change = (new - old) / old
+        marker = "REGRESSION" if change > tolerance and name not in REPORT_ONLY_CASES else ""
+        print(f"{name:<15} {old:>10.1f} ms -> {new:>10.1f} ms ({change:+.1%}) {marker}")
+        if marker:
+            regressions.append(name)
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark GUI and CLI startup time")
+    parser.add_argument("--cases", nargs="+", default=list(CASES), choices=list(CASES))
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--top-imports", type=int, default=10, help="Number of slowest GUI imports to list")
+    parser.add_argument("-o", "--output", default="startup_results.json")
+    parser.add_argument("--compare", default=None, help="Earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Relative change flagged as a regression")
+    args = parser.parse_args()
+
+    results = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "cases": {},
+    }
+
+    display = has_display()
+    for name in args.cases:
+        if name in DISPLAY_CASES and not display:
+            print(f"{name:<15} skipped (no display)")
+            results["cases"][name] = None
+            continue
+
+        startup_time = run_case(CASES[name], args.repeats)
+        results["cases"][name] = {"startup_ms": startup_time * 1000}
+        print(f"{name:<15} {startup_time * 1000:>10.1f} ms")
+
+    results["slowest_gui_imports"] = get_slowest_imports(CASES["import_gui"], args.top_imports)
+    print("Slowest imports on the GUI startup path:")
+    for item in results["slowest_gui_imports"]:
+        print(f"  {item['module']:<40} {item['cumulative_ms']:>8.1f} ms")
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare_results(results, baseline, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} regressions beyond {args.tolerance:.0%}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmarks SessionStore with many stored sessions, reporting insert rate and
+the latency of the longitudinal queries the GUI and CLI run:
+
+    python benchmarks/bench_store.py --sessions 20000
+"""
+
+import argparse
+import datetime
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from barbell_analyser import BarbellAnalyser
+from barbell_store import SessionStore
+
+LIFTS = ("squat", "bench", "deadlift", "press", "clean")
+
+
+def make_analyser(num_reps, rng):
+    # A bar moving through num_reps reps of 0.5 m at 30 fps
+    timestamps = np.arange(num_reps * 90) / 30
+    heights = 0.25 * (1 - np.cos(2 * np.pi * timestamps / 3)) + rng.normal(0, 0.002, len(timestamps))
+    positions = np.column_stack([np.zeros(len(timestamps)), -heights])
+    return BarbellAnalyser(positions, timestamps, len(timestamps))
+
+
+def time_query(query, repeats):
+    times = []
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        query()
+        times.append(time.perf_counter() - start_time)
+    return min(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the session store")
+    parser.add_argument("--sessions", type=int, default=20000)
+    parser.add_argument("--athletes", type=int, default=200)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--db", default=None, help="Database path (default: a temporary file)")
+    parser.add_argument("-o", "--output", default=None, help="Also write the results as JSON")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    analysers = [make_analyser(num_reps, rng) for num_reps in range(1, 9)]
+
+    db_path = args.db or os.path.join(tempfile.mkdtemp(), "sessions.db")
+    first_day = datetime.datetime(2024, 1, 1, 9)
+
+    with SessionStore(db_path) as store:
+        start_time = time.perf_counter()
+        for i in range(args.sessions):
+            store.save_session(
+                analysers[rng.integers(len(analysers))],
+                athlete=f"athlete{rng.integers(args.athletes)}",
+                lift=LIFTS[rng.integers(len(LIFTS))],
+                recorded_at=first_day + datetime.timedelta(hours=int(rng.integers(2 * 365 * 24)))
+            )
+        insert_time = time.perf_counter() - start_time
+
+        session_id = store.find_sessions(athlete="athlete0")[0]["id"]
+        results = {
+            "sessions": args.sessions,
+            "athletes": args.athletes,
+            "db_size_mb": os.path.getsize(db_path) / (1024 * 1024),
+            "inserts_per_second": args.sessions / insert_time,
+            "weekly_velocity_ms": time_query(lambda: store.get_weekly_velocity("athlete0", "squat"), args.repeats),
+            "weekly_velocity_range_ms": time_query(
+                lambda: store.get_weekly_velocity("athlete0", "squat", start=datetime.date(2024, 6, 1), end=datetime.date(2024, 9, 1)),
+                args.repeats),
+            "find_sessions_ms": time_query(lambda: store.find_sessions(athlete="athlete0", lift="squat"), args.repeats),
+            "get_reps_ms": time_query(lambda: store.get_reps(session_id), args.repeats),
+            "load_analyser_ms": time_query(lambda: store.load_analyser(session_id), args.repeats),
+        }
+
+    for name, value in results.items():
+        print(f"{name:<28} {value:>12.3f}" if isinstance(value, float) else f"{name:<28} {value:>12}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
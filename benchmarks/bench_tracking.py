@@ -0,0 +1,217 @@
+"""
+Benchmarks BarbellTracker and BarbellAnalyser on synthetic barbell videos,
+reporting throughput, analysis latency, peak memory and tracking error
+against ground truth. Results are written as JSON so runs can be compared
+for regressions:
+
+    python benchmarks/bench_tracking.py -o before.json
+    python benchmarks/bench_tracking.py -o after.json --compare before.json
+"""
+
+import argparse
+import concurrent.futures
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from barbell_tracker import BarbellTracker
+from barbell_analyser import BarbellAnalyser
+from synthetic_video import load_or_generate_video
+
+
+PRESETS = {
+    "default": {},
+    "fast": {"color_space": "gray", "pyramid_levels": 2},
+    "full_frame": {"predict_motion": False},
+    "optical_flow": {"color_space": "gray", "backend": "optical_flow"},
+    "hybrid_optical_flow": {"color_space": "gray", "backend": "hybrid_optical_flow"},
+}
+
+# Metrics where a larger value is better; everything else is better smaller
+HIGHER_IS_BETTER = ("track_fps", "track_frame_fps", "match_rate")
+
+
+def parse_resolution(value):
+    width, height = value.lower().split("x")
+    return int(width), int(height)
+
+
+def measure_memory(video_path, template_region, tracker_settings):
+    # Runs in a fresh process so its peak RSS covers this one run, OpenCV's
+    # native decode and match buffers included; tracemalloc only sees
+    # Python allocations
+    tracemalloc.start()
+    BarbellTracker(**tracker_settings).track(video_path, template_region=template_region)
+    peak_traced = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform != "darwin":
+        peak_rss *= 1024
+
+    return peak_traced, peak_rss
+
+
+def benchmark_case(video_path, ground_truth, preset, settings, repeats):
+    template_region = tuple(ground_truth["template_region"])
+    tracker_settings = dict(settings, show_preview=False)
+
+    # Whole-video tracking, decode included, timed without tracing
+    track_times = []
+    for _ in range(repeats):
+        tracker = BarbellTracker(**tracker_settings)
+        start_time = time.perf_counter()
+        trajectory = tracker.track(video_path, template_region=template_region)
+        track_times.append(time.perf_counter() - start_time)
+
+    spawn = multiprocessing.get_context("spawn")
+    with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=spawn) as executor:
+        peak_traced, peak_rss = executor.submit(measure_memory, video_path, template_region, tracker_settings).result()
+
+    frames_processed = tracker.current_frame
+    track_time = min(track_times)
+
+    # Matching alone, on frames decoded up front
+    cap = cv2.VideoCapture(video_path)
+    frames = []
+    while len(frames) < min(ground_truth["num_frames"], 120):
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+
+    frame_tracker = BarbellTracker(**tracker_settings)
+    x, y, w, h = template_region
+    frame_tracker.set_template(frames[0][y:y+h, x:x+w].copy(), template_region)
+    start_time = time.perf_counter()
+    for frame_index, frame in enumerate(frames):
+        frame_tracker.current_frame = frame_index + 1
+        position = frame_tracker.track_frame(frame)
+        frame_tracker.record_match(frame_index, position, frame_index)
+    track_frame_time = time.perf_counter() - start_time
+
+    # Analysis on the tracked series
+    analyser_times = []
+    for _ in range(repeats):
+        analyser = BarbellAnalyser.from_trajectory(trajectory, tracker.num_frames, tracker.pixels_per_meter)
+        start_time = time.perf_counter()
+        analyser.get_results()
+        analyser_times.append(time.perf_counter() - start_time)
+
+    # Tracking error at every matched frame
+    centers = np.array(ground_truth["centers"], dtype=np.float64)
+    samples = trajectory.get_valid()
+    errors = np.linalg.norm(samples["positions"] - centers[samples["frame_indices"]], axis=1)
+    sampled_frames = -(-ground_truth["num_frames"] // tracker.sample_interval)
+
+    return {
+        "name": f"{ground_truth['width']}x{ground_truth['height']}_{ground_truth['num_frames']}f"
+                f"_noise{ground_truth['noise']:g}_{preset}",
+        "width": ground_truth["width"],
+        "height": ground_truth["height"],
+        "num_frames": ground_truth["num_frames"],
+        "noise": ground_truth["noise"],
+        "preset": preset,
+        "settings": settings,
+        "track_fps": frames_processed / track_time,
+        "track_frame_fps": len(frames) / track_frame_time,
+        "analyser_latency_ms": min(analyser_times) * 1000,
+        "peak_memory_mb": peak_traced / (1024 * 1024),
+        "peak_rss_mb": peak_rss / (1024 * 1024),
+        "rmse_px": float(np.sqrt(np.mean(errors ** 2))) if len(errors) else None,
+        "max_error_px": float(np.max(errors)) if len(errors) else None,
+        "match_rate": len(samples["positions"]) / sampled_frames,
+    }
+
+
+def compare_results(results, baseline, tolerance):
+    baseline_cases = {case["name"]: case for case in baseline["cases"]}
+    regressions = []
+
+    for case in results["cases"]:
+        previous = baseline_cases.get(case["name"])
+        if previous is None:
+            continue
+
+        for metric in ("track_fps", "track_frame_fps", "analyser_latency_ms", "peak_memory_mb", "peak_rss_mb", "rmse_px", "match_rate"):
+            old, new = previous.get(metric), case.get(metric)
+            if not old or new is None:
+                continue
+
+            change = (new - old) / old
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            marker = "REGRESSION" if worse > tolerance else ""
+            print(f"{case['name']:<40} {metric:<20} {old:>10.2f} -> {new:>10.2f} ({change:+.1%}) {marker}")
+            if marker:
+                regressions.append((case["name"], metric))
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark barbell tracking on synthetic videos")
+    parser.add_argument("--resolutions", nargs="+", default=["640x360", "1280x720", "1920x1080"])
+    parser.add_argument("--lengths", nargs="+", type=int, default=[300])
+    parser.add_argument("--noise", nargs="+", type=float, default=[0, 8])
+    parser.add_argument("--presets", nargs="+", default=list(PRESETS), choices=list(PRESETS))
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--video-dir", default=os.path.join(tempfile.gettempdir(), "barbell_benchmark_videos"))
+    parser.add_argument("-o", "--output", default="benchmark_results.json")
+    parser.add_argument("--compare", default=None, help="Earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Relative change flagged as a regression")
+    args = parser.parse_args()
+
+    results = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "opencv": cv2.__version__,
+            "numpy": np.__version__,
+            "cpu_count": os.cpu_count(),
+        },
+        "cases": [],
+    }
+
+    for resolution in args.resolutions:
+        width, height = parse_resolution(resolution)
+        for num_frames in args.lengths:
+            for noise in args.noise:
+                video_path, ground_truth = load_or_generate_video(args.video_dir, width, height, num_frames, noise=noise)
+                for preset in args.presets:
+                    case = benchmark_case(video_path, ground_truth, preset, PRESETS[preset], args.repeats)
+                    results["cases"].append(case)
+                    print(f"{case['name']:<40} {case['track_fps']:>8.1f} fps  "
+                          f"match {case['track_frame_fps']:>8.1f} fps  "
+                          f"analyse {case['analyser_latency_ms']:>6.2f} ms  "
+                          f"mem {case['peak_memory_mb']:>7.1f} MB  "
+                          f"rss {case['peak_rss_mb']:>7.1f} MB  "
+                          f"rmse {case['rmse_px'] if case['rmse_px'] is not None else float('nan'):>5.2f} px")
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare_results(results, baseline, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} regressions beyond {args.tolerance:.0%}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
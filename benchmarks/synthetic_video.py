@@ -0,0 +1,96 @@
+"""
+This module is responsible for generating synthetic barbell videos: a textured
+plate moving along a known rep trajectory over a textured background, with
+optional sensor noise, so tracking accuracy can be measured against ground
+truth.
+"""
+
+import json
+import math
+import os
+
+import cv2
+import numpy as np
+
+
+def plate_center(frame_index, fps, width, height, rep_period=2.5):
+    # Vertical reps with a little horizontal sway, like a squat bar path
+    t = frame_index / fps
+    phase = 2 * math.pi * t / rep_period
+    x = width / 2 + 0.02 * width * math.sin(phase / 2)
+    y = height / 2 + 0.25 * height * (1 - math.cos(phase)) / 2 - 0.125 * height
+    return x, y
+
+
+def draw_plate(frame, center, radius):
+    cx, cy = int(round(center[0])), int(round(center[1]))
+    cv2.circle(frame, (cx, cy), radius, (30, 30, 30), -1)
+    cv2.circle(frame, (cx, cy), int(radius * 0.8), (40, 40, 190), -1)
+    cv2.circle(frame, (cx, cy), int(radius * 0.45), (210, 210, 210), -1)
+    cv2.circle(frame, (cx, cy), max(int(radius * 0.12), 2), (20, 20, 20), -1)
+    for angle in range(0, 360, 60):
+        end = (
+            int(cx + radius * 0.8 * math.cos(math.radians(angle))),
+            int(cy + radius * 0.8 * math.sin(math.radians(angle)))
+        )
+        cv2.line(frame, (cx, cy), end, (10, 10, 10), max(radius // 15, 1))
+
+
+def generate_video(path, width, height, num_frames, fps=30, noise=0.0, seed=0):
+    rng = np.random.default_rng(seed)
+
+    # Blurred noise gives the matcher a background that isn't trivially flat
+    background = rng.integers(40, 120, size=(height // 8 + 1, width // 8 + 1, 3), dtype=np.uint8)
+    background = cv2.resize(background, (width, height), interpolation=cv2.INTER_LINEAR)
+
+    radius = max(height // 12, 8)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    if not writer.isOpened():
+        raise Exception(f"Could not open video writer for {path}.")
+
+    centers = []
+    for frame_index in range(num_frames):
+        frame = background.copy()
+        center = plate_center(frame_index, fps, width, height)
+        draw_plate(frame, center, radius)
+        centers.append((int(round(center[0])), int(round(center[1]))))
+
+        if noise > 0:
+            frame = cv2.add(frame, rng.normal(0, noise, frame.shape).astype(np.int16), dtype=cv2.CV_8U)
+
+        writer.write(frame)
+
+    writer.release()
+
+    ground_truth = {
+        "width": width,
+        "height": height,
+        "fps": fps,
+        "num_frames": num_frames,
+        "noise": noise,
+        "radius": radius,
+        "template_region": [
+            centers[0][0] - radius,
+            centers[0][1] - radius,
+            2 * radius,
+            2 * radius,
+        ],
+        "centers": centers,
+    }
+    with open(os.path.splitext(path)[0] + ".json", "w") as f:
+        json.dump(ground_truth, f)
+
+    return ground_truth
+
+
+def load_or_generate_video(video_dir, width, height, num_frames, fps=30, noise=0.0):
+    os.makedirs(video_dir, exist_ok=True)
+    name = f"plate_{width}x{height}_{num_frames}f_noise{noise:g}"
+    path = os.path.join(video_dir, name + ".mp4")
+    ground_truth_path = os.path.join(video_dir, name + ".json")
+
+    if os.path.exists(path) and os.path.exists(ground_truth_path):
+        with open(ground_truth_path) as f:
+            return path, json.load(f)
+
+    return path, generate_video(path, width, height, num_frames, fps, noise)
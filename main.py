@@ -1,12 +1,197 @@
-import tkinter as tk
-
-from barbell_gui import BarbellGUI
+import argparse
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Barbell Velocity Analyzer")
+    subparsers = parser.add_subparsers(dest="command")
+
+    batch_parser = subparsers.add_parser("batch", help="Track and analyse many videos without the GUI")
+    batch_parser.add_argument("source", help="Directory of videos with template sidecars, or a JSON/CSV manifest")
+    batch_parser.add_argument("-o", "--output", default="results", help="Directory for per-clip results and the summary")
+    batch_parser.add_argument("-j", "--workers", type=int, default=None, help="Number of worker processes (default: CPU count)")
+    batch_parser.add_argument("--sample-interval", type=int, default=1)
+    batch_parser.add_argument("--barbell-height", type=float, default=0.45)
+    batch_parser.add_argument("--match-threshold", type=float, default=0.3)
+    batch_parser.add_argument("--pyramid-levels", type=int, default=0)
+    batch_parser.add_argument("--grayscale", action="store_true", help="Match in grayscale instead of BGR")
+    batch_parser.add_argument("--no-motion-prediction", action="store_true")
+    batch_parser.add_argument("--backend", default="template", help="Tracking backend, e.g. template, optical_flow, mosse, hybrid_mosse")
+    batch_parser.add_argument("--reanchor-interval", type=int, default=10, help="Frames between template re-anchors for hybrid backends")
+    batch_parser.add_argument("--no-auto-detect", action="store_true", help="Require a template region or image for every clip")
+    batch_parser.add_argument("--detection-threshold", type=float, default=0.6, help="Lowest plate detection confidence accepted")
+    batch_parser.add_argument("--cache-dir", default=None, help="Tracking result cache directory (default: ~/.barbell_tracker/cache)")
+    batch_parser.add_argument("--no-cache", action="store_true", help="Always re-track clips instead of using cached results")
+    batch_parser.add_argument("--export-format", choices=("csv", "npz", "parquet", "arrow"), default=None, help="Also export each clip's samples and reps in this format")
+    batch_parser.add_argument("--auto-range", action="store_true", help="Only track the part of each clip where the bar moves, unless it has start/end times")
+    batch_parser.add_argument("--smooth-window-length", type=int, default=15)
+    batch_parser.add_argument("--smooth-polynomial-order", type=int, default=3)
+    batch_parser.add_argument("--rep-min-range", type=float, default=0.1, help="Smallest vertical range counted as a rep (meters)")
+
+    live_parser = subparsers.add_parser("live", help="Track a camera or stream in real time")
+    live_parser.add_argument("source", help="Camera index, stream URL, or a video file to loop with --loop")
+    live_parser.add_argument("--loop", action="store_true", help="Loop a video file at its native fps in place of a camera")
+    live_parser.add_argument("--template-region", default=None, help="Plate region as x,y,w,h (default: detect, or select interactively)")
+    live_parser.add_argument("--latency-budget", type=float, default=100, help="Drop frames older than this many milliseconds")
+    live_parser.add_argument("--duration", type=float, default=None, help="Stop after this many seconds")
+    live_parser.add_argument("--barbell-height", type=float, default=0.45)
+    live_parser.add_argument("--match-threshold", type=float, default=0.3)
+    live_parser.add_argument("--grayscale", action="store_true", help="Match in grayscale instead of BGR")
+    live_parser.add_argument("--backend", default="template", help="Tracking backend, e.g. template, optical_flow, mosse, hybrid_mosse")
+    live_parser.add_argument("--reanchor-interval", type=int, default=10, help="Frames between template re-anchors for hybrid backends")
+    live_parser.add_argument("--no-auto-detect", action="store_true", help="Always select the plate by hand")
+    live_parser.add_argument("--detection-threshold", type=float, default=0.6, help="Lowest plate detection confidence accepted")
+    live_parser.add_argument("--no-preview", action="store_true")
+
+    history_parser = subparsers.add_parser("history", help="Show an athlete's weekly velocity from saved sessions")
+    history_parser.add_argument("athlete")
+    history_parser.add_argument("lift")
+    history_parser.add_argument("--from", dest="start", default=None, help="First date to include (YYYY-MM-DD)")
+    history_parser.add_argument("--to", dest="end", default=None, help="Date to stop before (YYYY-MM-DD)")
+    history_parser.add_argument("--db", default=None, help="Session database (default: ~/.barbell_tracker/sessions.db)")
+
+    serve_parser = subparsers.add_parser("serve", help="Analyse uploaded clips through a local HTTP job service")
+    serve_parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: localhost only)")
+    serve_parser.add_argument("--port", type=int, default=8765)
+    serve_parser.add_argument("-j", "--workers", type=int, default=2, help="Clips tracked at the same time")
+    serve_parser.add_argument("--queue-size", type=int, default=8, help="Clips waiting beyond which uploads are refused")
+    serve_parser.add_argument("--cache-dir", default=None, help="Tracking result cache directory (default: ~/.barbell_tracker/cache)")
+    serve_parser.add_argument("--no-cache", action="store_true", help="Always re-track clips instead of using cached results")
+    serve_parser.add_argument("--upload-dir", default=None, help="Directory for uploaded clips (default: a temporary directory)")
+    serve_parser.add_argument("--max-upload-mb", type=int, default=1024, help="Largest clip accepted, in megabytes")
+    serve_parser.add_argument("--log-requests", action="store_true")
+
+    args = parser.parse_args()
+
+    if args.command == "batch":
+        run_batch(args)
+    elif args.command == "live":
+        run_live(args)
+    elif args.command == "history":
+        run_history(args)
+    elif args.command == "serve":
+        run_serve(args)
+    else:
+        run_gui()
+
+
+def run_gui():
+    import tkinter as tk
+
+    from barbell_gui import BarbellGUI
+
     root = tk.Tk()
     app = BarbellGUI(root)
     root.mainloop()
 
+
+def run_batch(args):
+    import barbell_batch
+    import barbell_cache
+
+    jobs = barbell_batch.load_jobs(args.source)
+    print(f"Processing {len(jobs)} clips into {args.output}")
+
+    barbell_batch.run_batch(
+        jobs,
+        args.output,
+        workers=args.workers,
+        tracker_settings={
+            "sample_interval": args.sample_interval,
+            "barbell_height_m": args.barbell_height,
+            "match_threshold": args.match_threshold,
+            "pyramid_levels": args.pyramid_levels,
+            "color_space": "gray" if args.grayscale else "bgr",
+            "predict_motion": not args.no_motion_prediction,
+            "backend": args.backend,
+            "reanchor_interval": args.reanchor_interval,
+            "auto_detect": not args.no_auto_detect,
+            "detection_threshold": args.detection_threshold,
+        },
+        analyser_settings={
+            "smooth_window_length": args.smooth_window_length,
+            "smooth_polynomial_order": args.smooth_polynomial_order,
+            "rep_min_range_m": args.rep_min_range,
+        },
+        cache_dir=None if args.no_cache else args.cache_dir or barbell_cache.DEFAULT_CACHE_DIR,
+        export_format=args.export_format,
+        auto_range=args.auto_range
+    )
+
+
+def run_live(args):
+    from barbell_tracker import BarbellTracker
+    from barbell_streaming import StreamingAnalyser
+
+    def on_rep(rep):
+        print(f"Rep {rep['rep']}: mean {rep['mean_velocity']:.3f} m/s, "
+              f"peak {rep['peak_velocity']:.3f} m/s")
+
+    stream_analyser = StreamingAnalyser(on_rep=on_rep)
+    tracker = BarbellTracker(
+        show_preview=not args.no_preview,
+        barbell_height_m=args.barbell_height,
+        match_threshold=args.match_threshold,
+        color_space="gray" if args.grayscale else "bgr",
+        backend=args.backend,
+        reanchor_interval=args.reanchor_interval,
+        auto_detect=not args.no_auto_detect,
+        detection_threshold=args.detection_threshold,
+        on_position=lambda timestamp, position: stream_analyser.add_position(
+            timestamp, (position[0] / tracker.pixels_per_meter, position[1] / tracker.pixels_per_meter))
+    )
+
+    template_region = None
+    if args.template_region:
+        template_region = tuple(int(value) for value in args.template_region.split(","))
+
+    try:
+        tracker.track_live(
+            args.source,
+            template_region=template_region,
+            latency_budget=args.latency_budget / 1000,
+            duration=args.duration,
+            loop=args.loop
+        )
+    except KeyboardInterrupt:
+        tracker.stop()
+    stream_analyser.finish()
+
+    stats = tracker.live_stats
+    if stats:
+        print(f"Frames captured: {stats['frames_captured']}, matched: {stats['frames_matched']}, "
+              f"dropped: {stats['frames_dropped']}")
+        print(f"Capture-to-result latency: mean {stats['latency_mean'] * 1000:.1f} ms, "
+              f"max {stats['latency_max'] * 1000:.1f} ms")
+
+def run_history(args):
+    import barbell_store
+
+    with barbell_store.SessionStore(args.db or barbell_store.DEFAULT_DB_PATH) as store:
+        weeks = store.get_weekly_velocity(args.athlete, args.lift, start=args.start, end=args.end)
+
+    if not weeks:
+        print(f"No saved {args.lift} sessions for {args.athlete}.")
+        return
+
+    print(f"{'Week':<12} {'Mean concentric velocity':>26} {'Reps':>6} {'Sessions':>9}")
+    for week in weeks:
+        print(f"{week['week']:<12} {week['mean_concentric_velocity']:>22.3f} m/s "
+              f"{week['rep_count']:>6} {week['session_count']:>9}")
+
+def run_serve(args):
+    import barbell_cache
+    import barbell_server
+
+    barbell_server.run_server(
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        queue_size=args.queue_size,
+        cache_dir=None if args.no_cache else args.cache_dir or barbell_cache.DEFAULT_CACHE_DIR,
+        upload_dir=args.upload_dir,
+        max_upload_bytes=args.max_upload_mb * 1024 * 1024,
+        log_requests=args.log_requests
+    )
+
 if __name__ == "__main__":
     main()
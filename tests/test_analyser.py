@@ -0,0 +1,121 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from barbell_analyser import BarbellAnalyser
+
+FPS = 30
+REP_PERIOD_S = 2.0
+RANGE_OF_MOTION_M = 0.5
+PIXELS_PER_METER = 500
+
+
+def make_analyser(reps=3, **settings):
+    # The bar starts at the bottom and rises and falls RANGE_OF_MOTION_M once
+    # per period; image y points down, so height is subtracted
+    timestamps = np.arange(int(reps * REP_PERIOD_S * FPS) + 1) / FPS
+    heights = RANGE_OF_MOTION_M * (1 - np.cos(2 * np.pi * timestamps / REP_PERIOD_S)) / 2
+    positions = np.column_stack((np.full_like(timestamps, 160), 400 - heights * PIXELS_PER_METER))
+    return BarbellAnalyser(positions, timestamps, len(timestamps), pixels_per_meter=PIXELS_PER_METER, **settings)
+
+
+def test_counts_each_concentric_phase_as_a_rep():
+    reps = make_analyser(reps=3).get_reps()
+
+    assert reps["rep"].tolist() == [1, 2, 3]
+    np.testing.assert_allclose(reps["range_of_motion"], RANGE_OF_MOTION_M, atol=0.01)
+    np.testing.assert_allclose(reps["start_time"], [0, 2, 4], atol=1 / FPS)
+    np.testing.assert_allclose(reps["end_time"], [1, 3, 5], atol=1 / FPS)
+
+    # The peak of a sinusoid's velocity is amplitude times angular frequency
+    peak_velocity = RANGE_OF_MOTION_M / 2 * 2 * np.pi / REP_PERIOD_S
+    np.testing.assert_allclose(reps["peak_velocity"], peak_velocity, rtol=0.05)
+    np.testing.assert_allclose(reps["time_to_peak"], REP_PERIOD_S / 4, atol=2 / FPS)
+
+
+def test_pairs_reps_with_the_eccentric_phase_before_them():
+    reps = make_analyser(reps=3).get_reps()
+
+    # The first rep starts from rest, so it has no eccentric phase
+    assert np.isnan(reps["eccentric_duration"][0])
+    np.testing.assert_allclose(reps["eccentric_duration"][1:], REP_PERIOD_S / 2, atol=1 / FPS)
+    assert (reps["eccentric_peak_velocity"][1:] < 0).all()
+
+
+def test_ignores_movement_smaller_than_the_minimum_range():
+    analyser = make_analyser(reps=3, rep_min_range_m=RANGE_OF_MOTION_M * 2)
+
+    assert len(analyser.get_reps()["rep"]) == 0
+    assert analyser.get_results()["rep_count"] == 0
+
+
+def test_results_match_reps():
+    analyser = make_analyser(reps=2)
+    results = analyser.get_results()
+
+    assert results["rep_count"] == 2
+    assert results["total_points"] == len(analyser.timestamps)
+    assert results["rejected_points"] == 0
+
+
+def test_acceleration_smoothing_only_recalculates_accelerations():
+    analyser = make_analyser()
+    displacements = analyser.displacements
+    velocities = analyser.velocities
+    accelerations = analyser.accelerations
+    reps = analyser.get_reps()
+
+    analyser.update_settings(smooth_acceleration=False)
+
+    assert analyser.displacements is displacements
+    assert analyser.velocities is velocities
+    assert analyser.get_reps() is reps
+    assert analyser.accelerations is not accelerations
+
+
+def test_rep_range_only_recalculates_rep_stages():
+    analyser = make_analyser()
+    velocities = analyser.velocities
+    accelerations = analyser.accelerations
+    phases = analyser.get_phases()
+    reps = analyser.get_reps()
+
+    analyser.update_settings(rep_min_range_m=0.2)
+
+    assert analyser.velocities is velocities
+    assert analyser.accelerations is accelerations
+    assert analyser.get_phases() is not phases
+    assert analyser.get_reps() is not reps
+
+
+def test_window_length_recalculates_every_smoothed_stage():
+    analyser = make_analyser()
+    displacements = analyser.displacements
+    velocities = analyser.velocities
+    reps = analyser.get_reps()
+
+    analyser.update_settings(smooth_window_length=9)
+
+    assert analyser.displacements is not displacements
+    assert analyser.velocities is not velocities
+    assert analyser.get_reps() is not reps
+    assert len(analyser.get_reps()["rep"]) == 3
+
+
+def test_unchanged_settings_keep_every_stage():
+    analyser = make_analyser()
+    reps = analyser.get_reps()
+
+    analyser.update_settings(smooth_window_length=analyser.smooth_window_length)
+
+    assert analyser.get_reps() is reps
+
+
+def test_rejects_unknown_settings():
+    with pytest.raises(Exception):
+        make_analyser().update_settings(smooth_everything=True)
@@ -0,0 +1,37 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, "benchmarks"))
+
+from barbell_tracker import BarbellTracker
+from synthetic_video import generate_video
+
+
+@pytest.fixture(scope="module")
+def video(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("videos") / "plate.mp4")
+    ground_truth = generate_video(path, 320, 240, 150, noise=4)
+    return path, ground_truth
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_sub_range_uses_first_frame_region(video, workers):
+    # A region taken from frame 0 must still track correctly when the range
+    # starts after the plate has moved away from it
+    path, ground_truth = video
+    tracker = BarbellTracker(show_preview=False, auto_detect=False, workers=workers)
+    trajectory = tracker.track(path, template_region=tuple(ground_truth["template_region"]), start_frame=60, end_frame=120)
+
+    assert tracker.template_frame == 0
+    assert len(trajectory) == 60
+    assert trajectory.frame_indices[0] == 60
+
+    samples = trajectory.get_valid()
+    centers = np.array(ground_truth["centers"])[samples["frame_indices"]]
+    assert len(samples["positions"]) == 60
+    assert np.abs(samples["positions"] - centers).max() <= 2
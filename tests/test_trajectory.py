@@ -0,0 +1,120 @@
+import os
+import sys
+
+import numpy as np
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from barbell_trajectory import MIN_CAPACITY, Trajectory
+
+
+def fill(trajectory, count, rejected=()):
+    for i in range(count):
+        trajectory.append(i, i / 30, (i, 2 * i), 0.9, i not in rejected)
+
+
+def test_append_within_capacity_keeps_the_buffer():
+    trajectory = Trajectory(10)
+    data = trajectory.data
+    fill(trajectory, 10)
+
+    assert trajectory.data is data
+    assert len(trajectory) == 10
+    assert trajectory.capacity == 10
+
+
+def test_append_past_capacity_grows_and_keeps_samples():
+    trajectory = Trajectory(3)
+    fill(trajectory, 5)
+
+    assert len(trajectory) == 5
+    assert trajectory.capacity == MIN_CAPACITY
+    assert trajectory.frame_indices.tolist() == [0, 1, 2, 3, 4]
+    np.testing.assert_array_equal(trajectory.positions, [(i, 2 * i) for i in range(5)])
+
+    fill(trajectory, MIN_CAPACITY)
+    assert len(trajectory) == MIN_CAPACITY + 5
+    assert trajectory.capacity == 2 * MIN_CAPACITY
+
+
+def test_empty_trajectory_grows_on_first_append():
+    trajectory = Trajectory()
+    trajectory.append(7, 0.5, (1.0, 2.0), 0.8)
+
+    assert len(trajectory) == 1
+    assert trajectory.frame_indices.tolist() == [7]
+    assert trajectory.valid.tolist() == [True]
+
+
+def test_reserve_never_shrinks():
+    trajectory = Trajectory(8)
+    fill(trajectory, 4)
+    trajectory.reserve(2)
+
+    assert trajectory.capacity == 8
+    assert len(trajectory) == 4
+
+
+def test_columns_are_views_of_the_filled_samples():
+    trajectory = Trajectory(16)
+    fill(trajectory, 4)
+
+    columns = trajectory.get_columns()
+    for name, values in columns.items():
+        assert len(values) == 4
+        assert np.shares_memory(values, trajectory.data[name])
+
+
+def test_get_valid_is_zero_copy_when_nothing_was_rejected():
+    trajectory = Trajectory(16)
+    fill(trajectory, 6)
+
+    samples = trajectory.get_valid()
+    for name, values in samples.items():
+        assert np.shares_memory(values, trajectory.data[name])
+
+
+def test_get_valid_drops_rejected_samples():
+    trajectory = Trajectory(4)
+    fill(trajectory, 8, rejected={1, 4, 5})
+
+    assert trajectory.valid_count == 5
+    assert len(trajectory) == 8
+    assert trajectory.valid.tolist() == [True, False, True, True, False, False, True, True]
+
+    samples = trajectory.get_valid()
+    assert samples["frame_indices"].tolist() == [0, 2, 3, 6, 7]
+    np.testing.assert_array_equal(samples["positions"][:, 1], [0, 4, 6, 12, 14])
+    assert samples["valid"].all()
+
+
+def test_recent_valid_skips_rejected_samples():
+    trajectory = Trajectory()
+    fill(trajectory, 6, rejected={3, 5})
+
+    assert trajectory.recent_valid == [2, 4]
+
+    trajectory.append(6, 0.2, (0, 0), 0.9)
+    assert trajectory.recent_valid == [4, 6]
+
+
+def test_from_columns_matches_appended_samples():
+    trajectory = Trajectory()
+    fill(trajectory, 6, rejected={1, 5})
+
+    copy = Trajectory.from_columns(**trajectory.get_columns())
+
+    assert len(copy) == len(trajectory)
+    assert copy.valid_count == trajectory.valid_count
+    assert copy.recent_valid == trajectory.recent_valid
+    for name, values in trajectory.get_columns().items():
+        np.testing.assert_array_equal(copy.get_column(name), values)
+
+
+def test_from_columns_without_a_mask_is_all_valid():
+    trajectory = Trajectory.from_columns([0, 1, 2], [0.0, 0.1, 0.2], [[0, 0], [1, 1], [2, 2]], [0.9, 0.9, 0.9])
+
+    assert trajectory.valid_count == 3
+    assert trajectory.valid.all()
+    assert trajectory.recent_valid == [1, 2]